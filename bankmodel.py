@@ -6,9 +6,9 @@ import hashlib
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from typing import Dict, List, Optional, Union, Any
+from typing import Dict, List, Optional, Tuple, Union, Any
 import ollama
-from difflib import get_close_matches
+from difflib import SequenceMatcher, get_close_matches
 import base64
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
@@ -22,6 +22,7 @@ from email.mime.multipart import MIMEMultipart
 import os
 from io import BytesIO
 from pathlib import Path
+from storage import KeywordAutomaton
 
 # Load the bank data with error handling
 try:
@@ -462,6 +463,79 @@ class CGBankDatabase:
             print(f"Error saving account request: {e}")
             return False
 
+class IntentKeywordMatcher:
+    """Intent keyword table compiled once per bot.
+    
+    Exact matching is a single Aho-Corasick pass over the message, with the same
+    word-boundary rule as re's \\b applied to each hit. The fuzzy fallback looks up
+    keywords through a trigram index and only scores candidates that share a
+    trigram with the message and pass difflib's cheap upper bounds.
+    """
+    
+    def __init__(self, service_keywords: Dict[str, List[str]], cutoff: float = 0.6):
+        self.cutoff = cutoff
+        self._intents = list(service_keywords.keys())
+        # A keyword listed under several intents belongs to the first one, as before
+        self._priority: Dict[str, int] = {}
+        for priority, keywords in enumerate(service_keywords.values()):
+            for keyword in keywords:
+                self._priority.setdefault(keyword.lower(), priority)
+        self._automaton = KeywordAutomaton(self._priority)
+        self._trigram_index: Dict[str, set] = {}
+        for keyword in self._priority:
+            for gram in self._trigrams(keyword):
+                self._trigram_index.setdefault(gram, set()).add(keyword)
+    
+    @staticmethod
+    def _trigrams(text: str) -> set:
+        padded = f"  {text}  "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+    
+    @staticmethod
+    def _is_word_char(char: str) -> bool:
+        return char.isalnum() or char == '_'
+    
+    def _at_word_boundary(self, text: str, start: int, end: int) -> bool:
+        """Whether text[start:end] is delimited like re.search(r'\\b' + keyword + r'\\b')"""
+        before = start > 0 and self._is_word_char(text[start - 1])
+        after = end < len(text) and self._is_word_char(text[end])
+        return (before != self._is_word_char(text[start])) and (after != self._is_word_char(text[end - 1]))
+    
+    def match_all(self, message: str) -> List[Tuple[str, str]]:
+        """Get (intent, keyword) for every whole-word keyword hit, in message order"""
+        message = message.lower()
+        hits = []
+        for end_index, keyword, priority in self._automaton.find_all(message):
+            start = end_index - len(keyword) + 1
+            if self._at_word_boundary(message, start, end_index + 1):
+                hits.append((self._intents[priority], keyword))
+        return hits
+    
+    def closest_keyword(self, message: str) -> Optional[str]:
+        """Best keyword with a difflib ratio of at least cutoff, like get_close_matches(n=1)"""
+        message = message.lower()
+        candidates = set()
+        for gram in self._trigrams(message):
+            candidates.update(self._trigram_index.get(gram, ()))
+        
+        matcher = SequenceMatcher()
+        matcher.set_seq2(message)
+        best = None
+        for keyword in candidates:
+            matcher.set_seq1(keyword)
+            if (matcher.real_quick_ratio() >= self.cutoff and matcher.quick_ratio() >= self.cutoff
+                    and matcher.ratio() >= self.cutoff):
+                best = max(best, (matcher.ratio(), keyword)) if best else (matcher.ratio(), keyword)
+        return best[1] if best else None
+    
+    def identify(self, message: str) -> Optional[str]:
+        """Intent of the highest-priority keyword hit, else of the closest fuzzy keyword"""
+        hits = self.match_all(message)
+        if hits:
+            return min(hits, key=lambda hit: self._priority[hit[1]])[0]
+        keyword = self.closest_keyword(message)
+        return self._intents[self._priority[keyword]] if keyword else None
+
 class RexaBot:
     """CGBank's intelligent banking assistant with enhanced NLP capabilities"""
     
@@ -500,6 +574,7 @@ class RexaBot:
                                   'transactions from', 'transactions to', 'transactions in',
                                   'show transactions', 'find transactions', 'search transactions']
         }
+        self.intent_matcher = IntentKeywordMatcher(self.service_keywords)
         
         self.knowledge_base = self._create_knowledge_base()
     
@@ -758,22 +833,7 @@ class RexaBot:
     
     def _identify_intent(self, message: str) -> Optional[str]:
         """Identify the intent of the user message using NLP techniques"""
-        message = message.lower()
-        
-        for intent, keywords in self.service_keywords.items():
-            if any(re.search(r'\b' + re.escape(keyword) + r'\b', message) for keyword in keywords):
-                return intent
-        
-        all_keywords = [kw for sublist in self.service_keywords.values() for kw in sublist]
-        matches = get_close_matches(message, all_keywords, n=1, cutoff=0.6)
-        
-        if matches:
-            matched_keyword = matches[0]
-            for intent, keywords in self.service_keywords.items():
-                if matched_keyword in keywords:
-                    return intent
-        
-        return None
+        return self.intent_matcher.identify(message)
     
     def _extract_amount_filters(self, message: str) -> Dict[str, float]:
         """Extract amount filters from the message (greater than, less than, between)"""
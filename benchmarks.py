@@ -0,0 +1,455 @@
+"""Performance benchmarks for the CGBank app.
+
+Usage: python benchmarks.py <benchmark> [options]
+
+    login      password hashing throughput (logins per second per core)
+    calibrate  PBKDF2 iteration count for a per-login latency budget
+    intent     RexaBot intent classification throughput (messages per second)
+               (accuracy is measured offline by evaluate_intents.py)
+    nlp        spaCy load time and per-message cost, full pipeline vs stage profiles
+    batch      concurrent sessions parsing directly vs through the micro-batcher
+    entities   rule-first entity extraction vs always running NER
+    startup    time to first bot answer in a fresh process, persisted vs retrained intent model
+    responses  repeated FAQ questions with and without the static response cache
+    llm        LLM fallback against fake_ollama.py: connection reuse, semantic answer cache,
+               deadlines, circuit breaker
+    prompt     LLM first-token latency: cold vs warmed-up model, stable prompt prefix vs the
+               old layout with the query in the middle (fake_ollama.py, or --host for a real server)
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import spacy
+from fake_ollama import FakeOllamaServer
+from evaluate_intents import KeywordCosineBaseline
+from cra import (CGBankDatabase, CircuitBreaker, MessageContext, OllamaClient, PasswordHasher, ServerBusyError,
+                 LLM_MODEL, PASSWORD_ITERATIONS, RexaBot, NLP_MODEL, NLP_MODEL_COMPONENTS, NLP_PROFILES, NLPBatcher,
+                 ResponseCache, SemanticCache, get_nlp)
+
+SAMPLE_MESSAGES = [
+    "what is my account balance",
+    "show my recent transactions",
+    "how do I transfer money to my friend",
+    "tell me about home loans",
+    "which government schemes are there for farmers",
+    "where is the nearest atm",
+    "what are the fixed deposit interest rates",
+    "I lost my debit card",
+    "how can I open a student account",
+    "give me some saving tips",
+    "how do I keep my account safe from fraud",
+    "I want to file a complaint",
+]
+
+# Free-form questions that miss every intent, each asked three ways
+REWORDED_QUESTIONS = [
+    ["how does compound interest work", "How does compound interest work?", "how does compound intrest work"],
+    ["can I get a loan with bad credit", "can i get a loan with a bad credit score", "Can I get a loan with bad credit?"],
+    ["what is the emi for 10 lakh", "What is the EMI for 10 lakh?", "what is the emi for 10 lakh rupees"],
+    ["what happens if I miss an emi", "what happens if i miss an EMI payment", "What happens if I miss my emi?"],
+]
+
+
+def bench_login(args):
+    """Measure password hashing throughput inline and on the worker pool"""
+    password = "Benchmark@123"
+
+    # Baseline: hash on the calling thread, one login at a time
+    start = time.perf_counter()
+    for _ in range(args.baseline_logins):
+        CGBankDatabase.hash_password(password)
+    inline_rate = args.baseline_logins / (time.perf_counter() - start)
+
+    hasher = PasswordHasher(workers=args.workers, max_pending=args.max_pending)
+    counts = {'ok': 0, 'busy': 0}
+    lock = threading.Lock()
+    per_client = args.logins // args.clients
+
+    def client():
+        for _ in range(per_client):
+            try:
+                hasher.run(CGBankDatabase.hash_password, password)
+                outcome = 'ok'
+            except ServerBusyError:
+                outcome = 'busy'
+            with lock:
+                counts[outcome] += 1
+
+    threads = [threading.Thread(target=client) for _ in range(args.clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    pool_rate = counts['ok'] / elapsed
+
+    print(f"Inline hashing:   {inline_rate:8.1f} logins/sec (1 thread)")
+    print(f"Worker pool:      {pool_rate:8.1f} logins/sec "
+          f"({hasher.workers} workers, {args.clients} clients, max pending {hasher.max_pending})")
+    print(f"Per core:         {pool_rate / hasher.workers:8.1f} logins/sec/core "
+          f"({os.cpu_count()} cores available)")
+    print(f"Rejected (busy):  {counts['busy']} of {counts['ok'] + counts['busy']}")
+
+
+def bench_calibrate(args):
+    """Find the PBKDF2 iteration count that fits the per-login latency budget"""
+    password = "Benchmark@123"
+    iterations = 10000
+    elapsed = 0.0
+
+    # Grow the sample until timing noise is small, then scale linearly to the budget
+    while elapsed < 0.2:
+        start = time.perf_counter()
+        for _ in range(args.samples):
+            CGBankDatabase.hash_password(password, iterations)
+        elapsed = (time.perf_counter() - start) / args.samples
+        if elapsed < 0.2:
+            iterations *= 2
+
+    per_iteration = elapsed / iterations
+    suggested = int(args.target_ms / 1000 / per_iteration) // 1000 * 1000
+    current_ms = PASSWORD_ITERATIONS * per_iteration * 1000
+
+    print(f"Measured:  {per_iteration * 1e6:.3f} us per iteration")
+    print(f"Current:   {PASSWORD_ITERATIONS} iterations = {current_ms:.0f} ms per login")
+    print(f"Suggested: {suggested} iterations = {args.target_ms:.0f} ms per login")
+    print(f"\nexport CGBANK_PBKDF2_ITERATIONS={suggested}")
+
+
+def bench_intent(args):
+    """Compare the keyword cosine router with the intent classifier, per message and batched"""
+    bot = RexaBot()
+    baseline = KeywordCosineBaseline(bot.service_keywords, [])
+    messages = (SAMPLE_MESSAGES * (args.messages // len(SAMPLE_MESSAGES) + 1))[:args.messages]
+
+    for label, run in [
+        ("Keyword cosine", lambda: [baseline.classify([m])[0][0] for m in messages]),
+        ("Classifier", lambda: [bot._identify_intent(MessageContext(m)) for m in messages]),
+        ("Classifier (batch)", lambda: bot.identify_intents(messages)),
+    ]:
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        print(f"{label:24s} {len(messages) / elapsed:10.1f} messages/sec")
+
+
+def bench_nlp(args):
+    """Compare the full spaCy pipeline with the per-stage profiles"""
+    messages = (SAMPLE_MESSAGES * (args.messages // len(SAMPLE_MESSAGES) + 1))[:args.messages]
+
+    # Cold start: the old import-time load of every component vs the intent profile alone
+    start = time.perf_counter()
+    full = spacy.load(NLP_MODEL)
+    full_load = time.perf_counter() - start
+    start = time.perf_counter()
+    get_nlp('intent')
+    intent_load = time.perf_counter() - start
+    print(f"Load full pipeline:     {full_load * 1000:8.1f} ms ({', '.join(full.pipe_names)})")
+    print(f"Load intent profile:    {intent_load * 1000:8.1f} ms")
+
+    for profile, keep in NLP_PROFILES.items():
+        excluded = [c for c in NLP_MODEL_COMPONENTS if c not in keep]
+        print(f"Profile {profile:9s} keeps {', '.join(keep) or 'tokenizer only'}; excludes {', '.join(excluded)}")
+
+    for label, run in [
+        ("Full pipeline", lambda: [full(m) for m in messages]),
+        ("Intent profile", lambda: [get_nlp('intent')(m) for m in messages]),
+        ("Intent + NER profiles", lambda: [(get_nlp('intent')(m), get_nlp('entities')(m)) for m in messages]),
+    ]:
+        run()  # warm up lazy loads
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        print(f"{label:24s} {len(messages) / elapsed:10.1f} messages/sec")
+
+
+def bench_batch(args):
+    """Parse from many session threads, one nlp() call each vs micro-batched"""
+    pipeline = get_nlp('intent')
+    per_client = args.messages // args.clients
+    batchers = [("Micro-batched (thread)", NLPBatcher('intent', args.batch_size, args.wait_ms / 1000))]
+    if args.process:
+        batchers.append(("Micro-batched (process)",
+                         NLPBatcher('intent', args.batch_size, args.wait_ms / 1000, use_process=True)))
+    for _, batcher in batchers:
+        batcher.parse("warm up")
+
+    for label, parse in [("Direct nlp() per session", pipeline)] + \
+                        [(label, batcher.parse) for label, batcher in batchers]:
+        latencies = []
+        lock = threading.Lock()
+
+        def client():
+            for i in range(per_client):
+                start = time.perf_counter()
+                parse(SAMPLE_MESSAGES[i % len(SAMPLE_MESSAGES)])
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+
+        threads = [threading.Thread(target=client) for _ in range(args.clients)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95)] * 1000
+        print(f"{label:26s} {len(latencies) / elapsed:10.1f} messages/sec   p95 {p95:6.1f} ms")
+
+
+def bench_entities(args):
+    """Entity extraction as process_message runs it, rule-first vs NER on every message"""
+    bot = RexaBot()
+    messages = (SAMPLE_MESSAGES * (args.messages // len(SAMPLE_MESSAGES) + 1))[:args.messages]
+    intents = bot.identify_intents(messages)
+    every_slot = ('amounts', 'dates', 'locations')
+
+    for label, required in [("NER on every message", lambda intent: every_slot),
+                            ("Rule-first", lambda intent: bot.INTENT_SLOTS.get(intent, ()))]:
+        paths = {'rules': 0, 'ner': 0}
+        start = time.perf_counter()
+        for message, intent in zip(messages, intents):
+            ctx = MessageContext(message)
+            bot._extract_entities(ctx, required(intent))
+            paths[ctx.cache['entity_path']] += 1
+        elapsed = time.perf_counter() - start
+        print(f"{label:22s} {len(messages) / elapsed:10.1f} messages/sec   "
+              f"NER skipped {paths['rules'] / len(messages):6.1%}")
+
+
+def bench_responses(args):
+    """process_message on repeated FAQ questions, cached vs rebuilt through NLP every time"""
+    bot = RexaBot()
+    bot._get_ollama_response = lambda message, context="", on_token=None: "(LLM fallback)"
+    messages = (SAMPLE_MESSAGES * (args.messages // len(SAMPLE_MESSAGES) + 1))[:args.messages]
+
+    for label, cached in [("No response cache", False), ("Response cache", True)]:
+        bot.route_cache, bot.answer_cache = ResponseCache(), ResponseCache()
+        start = time.perf_counter()
+        for message in messages:
+            if not cached:
+                bot.route_cache, bot.answer_cache = ResponseCache(), ResponseCache()
+            bot.process_message(message)
+        elapsed = time.perf_counter() - start
+        print(f"{label:22s} {len(messages) / elapsed:10.1f} messages/sec   "
+              f"route hit rate {bot.route_cache.stats()['hit_rate']:6.1%}")
+
+
+def bench_llm(args):
+    """LLM fallback answers against the fake Ollama server, healthy and hung"""
+    bot = RexaBot()
+
+    with FakeOllamaServer(first_token_ms=args.first_token_ms, token_ms=args.token_ms, tokens=args.tokens) as server:
+        bot.llm_client = OllamaClient(host=server.url, max_concurrent=args.concurrency)
+        latencies = []
+
+        def session():
+            for _ in range(args.messages):
+                start = time.perf_counter()
+                stream = bot.stream_ollama_response("can you explain how compound interest works")
+                for _ in stream:
+                    pass
+                latencies.append((stream.time_to_first_token, time.perf_counter() - start))
+
+        threads = [threading.Thread(target=session) for _ in range(args.sessions)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        first_token = sorted(ttft for ttft, _ in latencies)
+        print(f"Healthy server   {len(latencies) / elapsed:8.1f} answers/sec   "
+              f"first token p50 {first_token[len(first_token) // 2] * 1000:6.0f} ms   "
+              f"{server.requests} requests over {len(server.connections)} connections")
+
+        # Reworded repeats of the same questions, with and without the semantic cache
+        questions = [question for variants in zip(*REWORDED_QUESTIONS) for question in variants]
+        for label, threshold in [("No LLM answer cache", 1.01), ("Semantic LLM cache", bot.llm_cache.threshold)]:
+            bot.llm_cache = SemanticCache(threshold=threshold)
+            requests = server.requests
+            start = time.perf_counter()
+            for question in questions:
+                bot._get_ollama_response(question)
+            elapsed = time.perf_counter() - start
+            print(f"{label:16s} {elapsed / len(questions) * 1000:8.0f} ms/answer   "
+                  f"{server.requests - requests} LLM calls for {len(questions)} questions   "
+                  f"hit rate {bot.llm_cache.stats()['hit_rate']:6.1%}")
+
+    with FakeOllamaServer(mode='hang') as server:
+        bot.llm_client = OllamaClient(host=server.url, breaker=CircuitBreaker(args.breaker_failures, 60))
+        generate_stream = bot.llm_client.generate_stream
+        bot.llm_client.generate_stream = lambda prompt, options, timeout: generate_stream(prompt, options, args.deadline)
+        for i in range(args.breaker_failures + 3):
+            start = time.perf_counter()
+            bot._get_ollama_response("can you explain how compound interest works")
+            print(f"Hung server, message {i + 1}: answered in {(time.perf_counter() - start) * 1000:7.0f} ms   "
+                  f"breaker {bot.llm_client.breaker.state}")
+
+
+def interleaved_prompt(bot, message, context):
+    """The prompt layout before the stable prefix: context, knowledge and query ahead of the guidelines"""
+    intro, guidelines = bot.LLM_PROMPT_PREFIX.split("**Response Guidelines:**")
+    tail = bot._build_llm_prompt(message, context)[len(bot.LLM_PROMPT_PREFIX):].replace("**Response:**\n", "")
+    return intro + tail + "**Response Guidelines:**" + guidelines + "**Response:**\n"
+
+
+def bench_prompt(args):
+    """First-token latency of LLM answers for model warm-up and prompt prefix reuse"""
+    bot = RexaBot()
+    server = None
+    if not args.host:
+        server = FakeOllamaServer(first_token_ms=args.first_token_ms, token_ms=1, tokens=5,
+                                  load_ms=args.load_ms, prefill_ms=args.prefill_ms).start()
+    client = OllamaClient(host=args.host or server.url)
+    options = {'num_predict': 5}
+    questions = [variants[0] for variants in REWORDED_QUESTIONS] + [
+        "what is a credit score", "how do I plan for my child's education",
+        "is it better to prepay a loan or invest", "what is the difference between neft and rtgs"]
+    context = "Customer: Priya\nAccount Type: Savings"
+
+    def first_token(prompt):
+        stream = client.generate_stream(prompt, options, timeout=120)
+        for _ in stream:
+            pass
+        return stream.time_to_first_token
+
+    def unload():
+        client._client.generate(model=LLM_MODEL, prompt="", keep_alive=0)
+
+    try:
+        unload()
+        cold = first_token(bot._build_llm_prompt(questions[0], context))
+        unload()
+        start = time.perf_counter()
+        client.warm_up(bot.LLM_PROMPT_PREFIX)
+        warm_up = time.perf_counter() - start
+        warm = first_token(bot._build_llm_prompt(questions[0], context))
+        print(f"First answer, cold model      first token {cold * 1000:8.0f} ms")
+        print(f"First answer, after warm-up   first token {warm * 1000:8.0f} ms   "
+              f"(warm-up at app start took {warm_up * 1000:.0f} ms)")
+
+        for label, build in [("Query mid-prompt (old)", lambda q: interleaved_prompt(bot, q, context)),
+                             ("Stable prefix", lambda q: bot._build_llm_prompt(q, context))]:
+            latencies = sorted(first_token(build(question)) for question in questions)
+            print(f"{label:29s} first token p50 {latencies[len(latencies) // 2] * 1000:6.0f} ms   "
+                  f"max {latencies[-1] * 1000:6.0f} ms   over {len(questions)} different questions")
+    finally:
+        if server:
+            server.stop()
+
+
+# Runs in a fresh interpreter: import the app, build the bot, answer one message
+STARTUP_CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import cra
+imported = time.perf_counter()
+bot = cra.RexaBot()
+built = time.perf_counter()
+bot.process_message(sys.argv[1])
+answered = time.perf_counter()
+print(json.dumps({'import': imported - start, 'bot': built - imported,
+                  'answer': answered - built, 'total': answered - start}))
+"""
+
+
+def bench_startup(args):
+    """Time to first bot answer, cold, with and without a persisted intent model"""
+    def run(model_dir):
+        env = dict(os.environ, CGBANK_INTENT_MODEL_DIR=model_dir)
+        output = subprocess.run([sys.executable, '-c', STARTUP_CHILD, args.message],
+                                env=env, capture_output=True, text=True, check=True).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, model_dir in [("Retrain (no artifact)", os.path.join(tmp, 'missing')),
+                                 ("Build artifact", os.path.join(tmp, 'model')),
+                                 ("Load artifact (mmap)", os.path.join(tmp, 'model'))]:
+            if label.startswith("Retrain"):
+                # Point at a file, not a directory, so the bot cannot save a model there
+                open(model_dir, 'w').close()
+            timings = [run(model_dir) for _ in range(1 if label == "Build artifact" else args.runs)]
+            best = {key: min(t[key] for t in timings) for key in timings[0]}
+            print(f"{label:22s} import {best['import'] * 1000:7.1f} ms   bot {best['bot'] * 1000:7.1f} ms   "
+                  f"first answer {best['answer'] * 1000:7.1f} ms   total {best['total'] * 1000:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CGBank performance benchmarks")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    login = subparsers.add_parser('login', help="password hashing throughput")
+    login.add_argument('--logins', type=int, default=400, help="total logins across all clients")
+    login.add_argument('--clients', type=int, default=32, help="concurrent client threads")
+    login.add_argument('--workers', type=int, default=None, help="hashing workers (default: CPU count)")
+    login.add_argument('--max-pending', type=int, default=None, help="queue depth limit")
+    login.add_argument('--baseline-logins', type=int, default=20, help="logins for the inline baseline")
+    login.set_defaults(func=bench_login)
+
+    calibrate = subparsers.add_parser('calibrate', help="PBKDF2 cost for a latency budget")
+    calibrate.add_argument('--target-ms', type=float, default=250.0, help="hashing budget per login")
+    calibrate.add_argument('--samples', type=int, default=3, help="hashes per timing sample")
+    calibrate.set_defaults(func=bench_calibrate)
+
+    intent = subparsers.add_parser('intent', help="intent classification throughput")
+    intent.add_argument('--messages', type=int, default=600, help="messages to classify")
+    intent.set_defaults(func=bench_intent)
+
+    nlp = subparsers.add_parser('nlp', help="spaCy pipeline profiles")
+    nlp.add_argument('--messages', type=int, default=600, help="messages to parse")
+    nlp.set_defaults(func=bench_nlp)
+
+    batch = subparsers.add_parser('batch', help="micro-batched parsing under concurrency")
+    batch.add_argument('--messages', type=int, default=2000, help="total messages across all clients")
+    batch.add_argument('--clients', type=int, default=16, help="concurrent session threads")
+    batch.add_argument('--batch-size', type=int, default=32, help="maximum messages per batch")
+    batch.add_argument('--wait-ms', type=float, default=5.0, help="maximum wait for a batch to fill")
+    batch.add_argument('--process', action='store_true', help="also measure the worker-process mode")
+    batch.set_defaults(func=bench_batch)
+
+    entities = subparsers.add_parser('entities', help="rule-first entity extraction")
+    entities.add_argument('--messages', type=int, default=600, help="messages to process")
+    entities.set_defaults(func=bench_entities)
+
+    startup = subparsers.add_parser('startup', help="time to first bot answer")
+    startup.add_argument('--runs', type=int, default=3, help="fresh processes per mode (best is reported)")
+    startup.add_argument('--message', default="tell me about home loans", help="first message to answer")
+    startup.set_defaults(func=bench_startup)
+
+    responses = subparsers.add_parser('responses', help="static response cache on repeated questions")
+    responses.add_argument('--messages', type=int, default=600, help="messages to process")
+    responses.set_defaults(func=bench_responses)
+
+    llm = subparsers.add_parser('llm', help="LLM client against the fake Ollama server")
+    llm.add_argument('--sessions', type=int, default=8, help="concurrent chat sessions")
+    llm.add_argument('--messages', type=int, default=5, help="LLM answers per session")
+    llm.add_argument('--concurrency', type=int, default=4, help="LLM calls in flight")
+    llm.add_argument('--first-token-ms', type=float, default=100, help="fake server first-token delay")
+    llm.add_argument('--token-ms', type=float, default=5, help="fake server delay between tokens")
+    llm.add_argument('--tokens', type=int, default=40, help="tokens per answer")
+    llm.add_argument('--deadline', type=float, default=1.0, help="per-answer deadline against the hung server")
+    llm.add_argument('--breaker-failures', type=int, default=3, help="failures that open the circuit")
+    llm.set_defaults(func=bench_llm)
+
+    prompt = subparsers.add_parser('prompt', help="LLM first-token latency: warm-up and prompt prefix reuse")
+    prompt.add_argument('--host', help="real Ollama server to measure instead of the fake one")
+    prompt.add_argument('--first-token-ms', type=float, default=30, help="fake server decode delay")
+    prompt.add_argument('--load-ms', type=float, default=2000, help="fake server model load time")
+    prompt.add_argument('--prefill-ms', type=float, default=20, help="fake server cost per 100 uncached prompt chars")
+    prompt.set_defaults(func=bench_prompt)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""Train RexaBot's intent classifier and write it to disk.
+
+Usage: python build_intent_model.py [output_dir]
+
+Training data is every service keyword plus the labeled utterances in
+intent_utterances.json. The app loads the artifact memory-mapped at startup
+(CGBANK_INTENT_MODEL_DIR, default ./intent_model) and only retrains when the
+training data has changed. Check accuracy with evaluate_intents.py first.
+"""
+import os
+import sys
+
+if len(sys.argv) > 1:
+    os.environ['CGBANK_INTENT_MODEL_DIR'] = sys.argv[1]
+
+from cra import INTENT_MODEL_DIR, IntentModelArtifact, RexaBot
+
+
+def main():
+    bot = RexaBot()
+    bot._train_similarity_model(rebuild=True)
+    texts, labels = bot.training_examples()
+    classifier = bot.intent_classifier
+    print(f"Wrote intent model to {INTENT_MODEL_DIR}:")
+    print(f"  intents:     {len(classifier.classes)}")
+    print(f"  examples:    {len(texts)}")
+    print(f"  weights:     {classifier.coef.nnz} non-zero of {classifier.coef.shape[0] * classifier.coef.shape[1]}")
+    print(f"  temperature: {classifier.temperature:.3f}")
+    print(f"  hash:        {IntentModelArtifact.training_hash(texts, labels)[:16]}")
+
+
+if __name__ == "__main__":
+    main()
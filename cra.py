@@ -1,13 +1,17 @@
 import json
 import re
 import random
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import hashlib
+import hmac
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from typing import Dict, List, Optional, Union, Any
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, Union, Any, Callable
+from collections import Counter, OrderedDict, deque
+from functools import lru_cache
 import ollama
+import httpx
 from difflib import get_close_matches
 import base64
 from reportlab.lib.pagesizes import letter
@@ -23,27 +27,345 @@ import os
 from io import BytesIO
 from pathlib import Path
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from scipy import sparse
+import sklearn
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import StratifiedKFold, cross_val_predict
+from sklearn.preprocessing import normalize
+from scipy.optimize import minimize_scalar
+from scipy.special import log_softmax, softmax
 import spacy
+from spacy.language import Language
+from spacy.tokens import Doc, DocBin
 from spacy.lang.en.stop_words import STOP_WORDS
 from string import punctuation
 from heapq import nlargest
 from enum import Enum
+import threading
+import time
+import queue
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import nlp_worker
+from storage import (DEFAULT_CATEGORY_RULES, JournalStore, SQLiteStore, TransactionCategorizer,
+                     normalize_username)
 
-# Load English language model for NLP
-try:
-    nlp = spacy.load('en_core_web_sm')
-except:
-    st.error("Spacy model 'en_core_web_sm' not found. Please install it.")
-    st.stop()
+NLP_MODEL = 'en_core_web_sm'
+# Pipeline components each processing stage needs; everything else is excluded at load time
+NLP_PROFILES = {
+    'intent': ['tok2vec', 'tagger', 'attribute_ruler', 'lemmatizer'],  # lemmas and POS tags
+    'entities': ['ner'],  # the small English model's NER has its own tok2vec
+    'feedback': [],  # tokenizer only, plus the sentiment component below
+}
+NLP_MODEL_COMPONENTS = ['tok2vec', 'tagger', 'parser', 'senter', 'attribute_ruler', 'lemmatizer', 'ner']
+
+# Micro-batching of concurrent chat messages (see NLPBatcher)
+NLP_BATCH_SIZE = int(os.environ.get('CGBANK_NLP_BATCH_SIZE', 32))
+NLP_BATCH_WAIT_MS = float(os.environ.get('CGBANK_NLP_BATCH_WAIT_MS', 5))
+NLP_WORKER_PROCESS = os.environ.get('CGBANK_NLP_PROCESS', '0') == '1'
+# Longest a chat turn waits for its message to be parsed
+NLP_PARSE_TIMEOUT = float(os.environ.get('CGBANK_NLP_PARSE_TIMEOUT', 10))
+
+# Fitted intent model written by build_intent_model.py (or on first start)
+INTENT_MODEL_DIR = os.environ.get('CGBANK_INTENT_MODEL_DIR', 'intent_model')
+INTENT_UTTERANCES_PATH = 'intent_utterances.json'
+# Calibrated probability below which a message has no intent and goes to the LLM
+INTENT_CONFIDENCE_THRESHOLD = float(os.environ.get('CGBANK_INTENT_THRESHOLD', 0.35))
+
+# Ollama model behind the free-form fallback, and the hard limit on one whole answer
+LLM_MODEL = 'banking-assistant'
+LLM_TIMEOUT_SECONDS = float(os.environ.get('CGBANK_LLM_TIMEOUT', 30))
+# LLM answers reused for questions at least this similar (cosine of hashed n-grams)
+LLM_CACHE_THRESHOLD = float(os.environ.get('CGBANK_LLM_CACHE_THRESHOLD', 0.85))
+LLM_CACHE_TTL_SECONDS = float(os.environ.get('CGBANK_LLM_CACHE_TTL', 3600))
+LLM_CACHE_SIZE = 512
+# Prompt size cap, and how many knowledge-base passages are retrieved per question
+LLM_PROMPT_TOKEN_BUDGET = int(os.environ.get('CGBANK_LLM_PROMPT_TOKENS', 768))
+KNOWLEDGE_TOP_K = 4
+# Cosine below which a passage is unrelated to the question
+KNOWLEDGE_MIN_SCORE = 0.05
+# The server itself is picked by OLLAMA_HOST, as for the ollama CLI
+LLM_CONNECT_TIMEOUT = float(os.environ.get('CGBANK_LLM_CONNECT_TIMEOUT', 2))
+LLM_MAX_CONCURRENT = int(os.environ.get('CGBANK_LLM_CONCURRENCY', 4))
+# Consecutive failures that open the circuit, and how long it stays open
+LLM_BREAKER_FAILURES = 5
+LLM_BREAKER_COOLDOWN = 30.0
+# How long Ollama keeps the model loaded after a call: a duration such as '30m', or seconds (-1 = always)
+LLM_KEEP_ALIVE: Union[str, float] = os.environ.get('CGBANK_LLM_KEEP_ALIVE', '30m')
+if re.fullmatch(r'-?\d+(\.\d+)?', LLM_KEEP_ALIVE):
+    LLM_KEEP_ALIVE = float(LLM_KEEP_ALIVE)
+
+Doc.set_extension('polarity', default=0.0, force=True)
+Doc.set_extension('subjectivity', default=0.0, force=True)
+
+@Language.component('textblob_sentiment')
+def textblob_sentiment(doc: Doc) -> Doc:
+    """Annotate a doc with TextBlob polarity and subjectivity"""
+    try:
+        from textblob import TextBlob
+    except ImportError:
+        return doc
+    blob = TextBlob(doc.text)
+    doc._.polarity = blob.sentiment.polarity
+    doc._.subjectivity = blob.sentiment.subjectivity
+    return doc
+
+@st.cache_resource
+def get_nlp(profile: str) -> Language:
+    """Load the spaCy pipeline for one processing stage on first use.
+    
+    Each profile only loads the components listed in NLP_PROFILES, so the intent
+    stage never pays for the parser or NER, and feedback sentiment does not need
+    the statistical model at all. Raises OSError when the model is not installed;
+    this may run on a worker thread, so it is up to the caller to tell the user.
+    """
+    if profile == 'feedback':
+        pipeline = spacy.blank('en')
+        pipeline.add_pipe('textblob_sentiment', last=True)
+        return pipeline
+    
+    try:
+        return spacy.load(NLP_MODEL, exclude=nlp_profile_exclude(profile))
+    except OSError as e:
+        raise OSError(f"Spacy model '{NLP_MODEL}' not found. Please install it.") from e
+
+def nlp_profile_exclude(profile: str) -> List[str]:
+    """Model components a profile leaves out"""
+    return [c for c in NLP_MODEL_COMPONENTS if c not in NLP_PROFILES[profile]]
+
+class NLPBatcher:
+    """Parses messages from concurrent chat sessions in micro-batches.
+    
+    Session threads submit a message and get a Future. A single worker thread
+    runs queued messages through nlp.pipe in batches of up to max_batch. While
+    sessions are sending concurrently (the last batch held more than one
+    message) it first waits up to max_wait seconds for the batch to fill; a
+    lone message on an idle server is parsed straight away. With
+    use_process, the batch is parsed in a worker process instead and the docs
+    come back as DocBin bytes, so parsing does not hold this process's GIL.
+    """
+    
+    def __init__(self, profile: str, max_batch: int = 32, max_wait: float = 0.005,
+                 use_process: bool = False):
+        self.profile = profile
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._last_batch_size = 0
+        self._executor = None
+        if use_process:
+            self._vocab = spacy.blank('en').vocab
+            self._executor = self._start_worker()
+        self._thread = threading.Thread(target=self._run, name=f"nlp-batcher-{profile}", daemon=True)
+        self._thread.start()
+    
+    def _start_worker(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context('spawn'),
+            initializer=nlp_worker.init_worker, initargs=(NLP_MODEL, nlp_profile_exclude(self.profile)))
+    
+    def submit(self, text: str) -> Future:
+        """Queue a message for the next batch"""
+        future = Future()
+        with self._cond:
+            self._pending.append((text, future))
+            self._cond.notify()
+        return future
+    
+    def parse(self, text: str, timeout: Optional[float] = None) -> Doc:
+        """Parse one message, blocking until its batch has run.
+        
+        Raises ServerBusyError when the message is not parsed within timeout.
+        """
+        future = self.submit(text)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            # Still queued: drop it so the worker does not parse it for nobody
+            future.cancel()
+            raise ServerBusyError("Message parsing timed out")
+    
+    def _next_batch(self) -> List[Any]:
+        """Wait for a message, then briefly for company under load, and take up to max_batch"""
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            under_load = self._last_batch_size > 1 or len(self._pending) > 1
+            deadline = time.monotonic() + self.max_wait
+            while under_load and len(self._pending) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = [self._pending.popleft() for _ in range(min(self.max_batch, len(self._pending)))]
+            self._last_batch_size = len(batch)
+        # Skip messages whose caller already gave up; the rest can no longer be cancelled
+        return [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+    
+    def _parse_batch(self, texts: List[str]) -> List[Doc]:
+        if self._executor is None:
+            return list(get_nlp(self.profile).pipe(texts))
+        try:
+            data = self._executor.submit(nlp_worker.parse_batch, texts).result()
+        except BrokenProcessPool:
+            # The worker process died (e.g. killed for memory); fail this batch, serve the next from a new one
+            self._executor.shutdown(wait=False)
+            self._executor = self._start_worker()
+            raise
+        return list(DocBin().from_bytes(data).get_docs(self._vocab))
+    
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                docs = self._parse_batch([text for text, _ in batch])
+            except BaseException as e:
+                # Resolve every waiting caller and keep serving, whatever went wrong: this
+                # thread belongs to a cached batcher that every later chat turn depends on
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), doc in zip(batch, docs):
+                future.set_result(doc)
+
+@st.cache_resource
+def get_nlp_batcher(profile: str) -> NLPBatcher:
+    """Process-wide micro-batcher for one NLP profile.
+    
+    The pipeline is loaded here, on the calling script thread, so a missing model
+    raises to the caller instead of failing on the batcher thread.
+    """
+    if not NLP_WORKER_PROCESS:
+        get_nlp(profile)
+    return NLPBatcher(profile, max_batch=NLP_BATCH_SIZE, max_wait=NLP_BATCH_WAIT_MS / 1000,
+                      use_process=NLP_WORKER_PROCESS)
+
+@st.cache_resource
+def get_data_store():
+    """Open the process-wide data store selected by CGBANK_STORAGE (json or sqlite)"""
+    if os.environ.get('CGBANK_STORAGE', 'json').lower() == 'sqlite':
+        store = SQLiteStore(os.environ.get('CGBANK_DB_PATH', 'cgbank.db'))
+        store.load()
+        return store
+    
+    store = JournalStore('dummydata.json')
+    store.load()
+    store.start_compactor()
+    return store
+
+class ServerBusyError(Exception):
+    """Raised when a bounded worker pool is saturated and the caller should retry later"""
+
+class PasswordHasher:
+    """Bounded thread pool for password hashing.
+    
+    hashlib releases the GIL while running PBKDF2, so hashes from concurrent sessions
+    run in parallel on the worker threads. Queued plus running jobs are capped; once the
+    cap is reached new logins get an immediate "busy, retry" instead of piling up.
+    """
+    
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None,
+                 timeout: float = 10.0):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 4
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hasher')
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+    
+    def run(self, func: Callable[..., Any], *args) -> Any:
+        """Run a hashing function on the pool and wait for its result"""
+        if not self._slots.acquire(blocking=False):
+            raise ServerBusyError("Too many logins in progress")
+        try:
+            future = self._executor.submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise ServerBusyError("Password check timed out")
+
+@st.cache_resource
+def get_password_hasher() -> PasswordHasher:
+    """Get the process-wide password hashing pool"""
+    return PasswordHasher()
+
+class LoginRateLimitedError(Exception):
+    """Raised when a login attempt exceeds the rate limit for its username or client"""
+
+class TokenBucketLimiter:
+    """In-process token bucket rate limiter shared by every session.
+    
+    Each key holds only its token count and last refill time. Keys are kept in
+    least-recently-used order so idle keys (a full bucket after `ttl` seconds) are
+    evicted from the front in amortized constant time.
+    """
+    
+    def __init__(self, capacity: float, refill_per_second: float, ttl: Optional[float] = None):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.ttl = ttl if ttl is not None else capacity / refill_per_second
+        self._buckets: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def allow(self, key: str, cost: float = 1.0) -> bool:
+        """Take `cost` tokens from the key's bucket if it has them"""
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            tokens, updated = self._buckets.pop(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.refill_per_second)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            return allowed
+    
+    def _evict(self, now: float):
+        while self._buckets:
+            key, (_, updated) = next(iter(self._buckets.items()))
+            if now - updated < self.ttl:
+                break
+            del self._buckets[key]
+
+# Reverse proxies in front of the app that append the peer address to X-Forwarded-For.
+# With 0 the header is ignored, since any client can send it.
+TRUSTED_PROXY_HOPS = int(os.environ.get('CGBANK_TRUSTED_PROXY_HOPS', 0))
+
+class LoginRateLimiter:
+    """Server-wide login throttling keyed by username and by client"""
+    
+    def __init__(self):
+        # 5 attempts per username, then one more every 30 seconds
+        self.by_username = TokenBucketLimiter(capacity=5, refill_per_second=1 / 30)
+        # 20 attempts per client, then one more every 3 seconds
+        self.by_client = TokenBucketLimiter(capacity=20, refill_per_second=1 / 3)
+    
+    def allow(self, username: str, client_id: Optional[str]) -> bool:
+        if client_id and not self.by_client.allow(client_id):
+            return False
+        return self.by_username.allow(normalize_username(username))
+
+@st.cache_resource
+def get_login_rate_limiter() -> LoginRateLimiter:
+    """Get the process-wide login rate limiter"""
+    return LoginRateLimiter()
 
 # Load the bank data with error handling
 try:
-    with open('dummydata.json', 'r') as f:
-        BANK_DATA = json.load(f)
-except FileNotFoundError:
-    st.error("Error: dummydata.json file not found!")
+    DATA_STORE = get_data_store()
+    BANK_DATA = DATA_STORE.data
+except FileNotFoundError as e:
+    st.error(f"Error: {e.filename or 'dummydata.json'} file not found!")
     st.stop()
 except json.JSONDecodeError:
     st.error("Error: Invalid JSON format in dummydata.json!")
@@ -76,8 +398,19 @@ REQUIRED_KEYS = ['users', 'bank_info', 'loan_products', 'government_schemes',
                 'transactions_history', 'bills', 'spending_categories', 'bot_responses',
                 'account_info', 'account_requests', 'atm_locations', 'branch_locations']
 
+# Password hashing: "pbkdf2_sha256$<iterations>$<salt>$<hash>" with a per-user salt.
+# Tune the cost per deployment with `python benchmarks.py calibrate`.
+PASSWORD_ALGORITHM = 'pbkdf2_sha256'
+PASSWORD_ITERATIONS = int(os.environ.get('CGBANK_PBKDF2_ITERATIONS', 310000))
+LEGACY_PASSWORD_SALT = "CGBank_Secure_Salt_Value_2023!"
+LEGACY_PASSWORD_ITERATIONS = 100000
+
+# Catalog sections the bot knowledge base is built from (excludes per-customer data)
+CATALOG_KEYS = ['bank_info', 'loan_products', 'government_schemes', 'bank_accounts',
+                'atm_locations', 'branch_locations']
+
 for key in REQUIRED_KEYS:
-    if key not in BANK_DATA:
+    if key not in BANK_DATA and key not in DATA_STORE.TABLE_SECTIONS:
         if key == 'account_requests':
             BANK_DATA['account_requests'] = []
         elif key == 'users':
@@ -239,6 +572,176 @@ if 'government_schemes' not in BANK_DATA:
         }
     }
 
+@st.cache_resource
+def get_transaction_categorizer(rules_json: str) -> TransactionCategorizer:
+    """Get the process-wide categorizer compiled for a rule table (JSON-encoded cache key)"""
+    return TransactionCategorizer(json.loads(rules_json))
+
+def get_category_rules_json() -> str:
+    """Get the active category rules from the bank data, encoded as the categorizer cache key"""
+    return json.dumps(BANK_DATA.get('category_rules', DEFAULT_CATEGORY_RULES), sort_keys=True)
+
+class DateRange(NamedTuple):
+    """Inclusive datetime range; either end may be open (None)"""
+    start: Optional[datetime]
+    end: Optional[datetime]
+    
+    def as_filters(self) -> Dict[str, datetime]:
+        """The range as transaction filters (start_date / end_date)"""
+        filters = {}
+        if self.start:
+            filters['start_date'] = self.start
+        if self.end:
+            filters['end_date'] = self.end
+        return filters
+
+class DateRangeParser:
+    """Deterministic date-range parser for chat messages, with no NLP model.
+    
+    Understands relative periods (today, yesterday, last/past/this week, last 3
+    months, 2 days ago), month names (march, 5th march 2024, march 5), ISO dates
+    and Indian day-first dates (05/03/2024, 5-3-24), joined by from/since/after,
+    to/until/before or between ... and. Results are memoized per normalized
+    phrase and calendar day, so repeated questions cost one dict lookup.
+    """
+    MONTHS = {name: number for number, names in enumerate([
+        ('january', 'jan'), ('february', 'feb'), ('march', 'mar'), ('april', 'apr'), ('may',),
+        ('june', 'jun'), ('july', 'jul'), ('august', 'aug'), ('september', 'sept', 'sep'),
+        ('october', 'oct'), ('november', 'nov'), ('december', 'dec')], 1) for name in names}
+    UNIT_DAYS = {'day': 1, 'week': 7, 'month': 30, 'year': 365}
+    NUMBER_WORDS = {'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6,
+                    'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10, 'twelve': 12}
+    
+    _MONTH = '|'.join(sorted(MONTHS, key=len, reverse=True))
+    # 'may' alone is usually the verb, so a bare month name must not be 'may'
+    _BARE_MONTH = '|'.join(sorted((m for m in MONTHS if m != 'may'), key=len, reverse=True))
+    _COUNT = r'\d+|' + '|'.join(NUMBER_WORDS)
+    PATTERN = re.compile(rf"""
+        (?P<iso>\b(?P<iso_y>\d{{4}})-(?P<iso_m>\d{{1,2}})-(?P<iso_d>\d{{1,2}})\b)
+      | (?P<numeric>\b(?P<num_d>\d{{1,2}})[/.-](?P<num_m>\d{{1,2}})[/.-](?P<num_y>\d{{4}}|\d{{2}})\b)
+      | (?P<ago>\b(?P<ago_n>{_COUNT})\s+(?P<ago_unit>day|week|month|year)s?\s+ago\b)
+      | (?P<rolling>\b(?:last|past|previous)\s+(?:(?P<roll_n>{_COUNT})\s+)?(?P<roll_unit>day|week|month|year)s?\b)
+      | (?P<this>\b(?:this|current)\s+(?P<this_unit>week|month|year)\b)
+      | (?P<today>\btoday\b)
+      | (?P<yesterday>\byesterday\b)
+      | (?P<day_month>\b(?P<dm_d>\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?(?P<dm_m>{_MONTH})\b,?(?:\s+(?P<dm_y>\d{{4}}))?)
+      | (?P<month_day>\b(?P<md_m>{_MONTH})\s+(?P<md_d>\d{{1,2}})(?:st|nd|rd|th)?\b(?:,?\s+(?P<md_y>\d{{4}}))?)
+      | (?P<month>\b(?:(?P<m_m>{_BARE_MONTH})|may(?=\s+\d{{4}}))\b(?:\s+(?P<m_y>\d{{4}}))?)
+    """, re.VERBOSE | re.IGNORECASE)
+    # A connector only counts right before its date ("from the 5th"), never "to mom last week"
+    CONNECTOR = re.compile(r'\b(from|since|after|between|until|till|up to|to|before)(?:\s+(?:the|of))*\s*$')
+    RANGE_JOIN = re.compile(r'^\s*(?:to|and|till|until|-)\s*$')
+    START_CONNECTORS = ('from', 'since', 'between')
+    END_CONNECTORS = ('to', 'until', 'till', 'up to')
+    
+    @staticmethod
+    def parse(text: str, today: Optional[date] = None) -> Optional[DateRange]:
+        """Get the date range a message refers to, or None if it mentions no dates"""
+        phrase = re.sub(r'\s+', ' ', text.strip().lower())
+        return DateRangeParser._parse(phrase, today or date.today())
+    
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _parse(phrase: str, today: date) -> Optional[DateRange]:
+        found = []
+        previous_end = 0
+        for match in DateRangeParser.PATTERN.finditer(phrase):
+            resolved = DateRangeParser._resolve(match, today)
+            if resolved:
+                connector = DateRangeParser.CONNECTOR.search(phrase[previous_end:match.start()])
+                found.append((resolved, connector.group(1) if connector else None, match))
+            previous_end = match.end()
+        if not found:
+            return None
+        
+        (first, connector, first_match) = found[0]
+        end_of_today = datetime.combine(today, datetime.max.time())
+        if len(found) >= 2:
+            second, second_connector, second_match = found[1]
+            # Either date may name the start: "from 01/10 to 10/10", "till 10/10 from 01/10"
+            if connector in ('from', 'between') or connector in DateRangeParser.END_CONNECTORS or \
+                    second_connector in DateRangeParser.START_CONNECTORS or \
+                    DateRangeParser.RANGE_JOIN.match(phrase[first_match.end():second_match.start()]):
+                # "between 10/05 and 01/05" means the same days as "between 01/05 and 10/05"
+                if second.start < first.start:
+                    first, second = second, first
+                return DateRange(first.start, second.end)
+            first = DateRange(min(r.start for r, _, _ in found), max(r.end for r, _, _ in found))
+        
+        if connector in ('from', 'since'):
+            return DateRange(first.start, end_of_today)
+        if connector == 'after':
+            return DateRange(first.end + timedelta(microseconds=1), end_of_today)
+        if connector in DateRangeParser.END_CONNECTORS:
+            return DateRange(None, first.end)
+        if connector == 'before':
+            return DateRange(None, first.start - timedelta(microseconds=1))
+        return first
+    
+    @staticmethod
+    def _days(first: date, last: date) -> DateRange:
+        return DateRange(datetime.combine(first, datetime.min.time()),
+                         datetime.combine(last, datetime.max.time()))
+    
+    @staticmethod
+    def _count(value: Optional[str]) -> int:
+        if not value:
+            return 1
+        return int(value) if value.isdigit() else DateRangeParser.NUMBER_WORDS[value]
+    
+    @staticmethod
+    def _month_range(year: int, month: int) -> DateRange:
+        next_month = date(year + month // 12, month % 12 + 1, 1)
+        return DateRangeParser._days(date(year, month, 1), next_month - timedelta(days=1))
+    
+    @staticmethod
+    def _resolve(match: re.Match, today: date) -> Optional[DateRange]:
+        """Turn one matched expression into a range of whole days"""
+        days = DateRangeParser._days
+        group = match.group
+        try:
+            if group('iso'):
+                day = date(int(group('iso_y')), int(group('iso_m')), int(group('iso_d')))
+                return days(day, day)
+            if group('numeric'):
+                year = int(group('num_y'))
+                day = date(year + 2000 if year < 100 else year, int(group('num_m')), int(group('num_d')))
+                return days(day, day)
+            if group('ago'):
+                unit_days = DateRangeParser.UNIT_DAYS[group('ago_unit')]
+                day = today - timedelta(days=DateRangeParser._count(group('ago_n')) * unit_days)
+                return days(day, day)
+            if group('rolling'):
+                unit_days = DateRangeParser.UNIT_DAYS[group('roll_unit')]
+                return days(today - timedelta(days=DateRangeParser._count(group('roll_n')) * unit_days), today)
+            if group('this'):
+                unit = group('this_unit')
+                if unit == 'week':
+                    return days(today - timedelta(days=today.weekday()), today)
+                if unit == 'month':
+                    return days(today.replace(day=1), today)
+                return days(today.replace(month=1, day=1), today)
+            if group('today'):
+                return days(today, today)
+            if group('yesterday'):
+                return days(today - timedelta(days=1), today - timedelta(days=1))
+            
+            # Month names: without a year, the most recent such date that is not in the future
+            if group('day_month') or group('month_day'):
+                month = DateRangeParser.MONTHS[group('dm_m') or group('md_m')]
+                day_number = int(group('dm_d') or group('md_d'))
+                year = group('dm_y') or group('md_y')
+                day = date(int(year) if year else today.year, month, day_number)
+                if not year and day > today:
+                    day = day.replace(year=today.year - 1)
+                return days(day, day)
+            month = DateRangeParser.MONTHS[group('m_m') or 'may']
+            year = int(group('m_y')) if group('m_y') else (today.year if month <= today.month else today.year - 1)
+            return DateRangeParser._month_range(year, month)
+        except ValueError:
+            # Impossible dates such as 31/02/2024
+            return None
+
 class PDFGenerator:
     """Enhanced PDF report generator with better formatting and security features"""
     
@@ -464,8 +967,8 @@ class FeedbackSystem:
         try:
             # Analyze feedback sentiment
             sentiment = "Neutral"
-            doc = nlp(feedback)
-            sentiment_score = doc._.polarity if hasattr(doc._, 'polarity') else 0
+            doc = get_nlp('feedback')(feedback)
+            sentiment_score = doc._.polarity
             
             if sentiment_score > 0.3:
                 sentiment = "Positive"
@@ -522,95 +1025,142 @@ class CGBankDatabase:
     """Enhanced database class with transaction categorization and analytics"""
     
     @staticmethod
-    def _save_data():
-        """Save the current BANK_DATA to the JSON file with backup"""
+    def _persist(write: Callable[..., Any], *args) -> bool:
+        """Run a data store write, reporting failures in the UI"""
         try:
-            # Create backup
-            backup_path = Path('dummydata_backup.json')
-            if backup_path.exists():
-                backup_path.unlink()
-            Path('dummydata.json').rename(backup_path)
-            
-            # Save new data
-            with open('dummydata.json', 'w') as f:
-                json.dump(BANK_DATA, f, indent=2)
+            write(*args)
             return True
         except Exception as e:
             st.error(f"Error saving data: {str(e)}")
-            try:
-                # Restore backup if save failed
-                if backup_path.exists():
-                    backup_path.rename('dummydata.json')
-            except:
-                pass
             return False
     
     @staticmethod
-    def hash_password(password: str) -> str:
-        """Hash password using PBKDF2 with HMAC-SHA256"""
-        salt = "CGBank_Secure_Salt_Value_2023!"
-        iterations = 100000
-        return hashlib.pbkdf2_hmac(
-            'sha256',
-            password.encode('utf-8'),
-            salt.encode('utf-8'),
-            iterations
-        ).hex()
+    def hash_password(password: str, iterations: Optional[int] = None, salt: Optional[str] = None) -> str:
+        """Hash password using PBKDF2 with HMAC-SHA256 in the self-describing storage format"""
+        iterations = iterations or PASSWORD_ITERATIONS
+        salt = salt or base64.b64encode(os.urandom(16)).decode('ascii')
+        digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), iterations)
+        return f"{PASSWORD_ALGORITHM}${iterations}${salt}${base64.b64encode(digest).decode('ascii')}"
     
     @staticmethod
-    def get_user(username: str) -> Optional[Dict[str, Any]]:
-        """Get user data by username with case-insensitive search and fuzzy matching"""
-        username_lower = username.lower()
-        
-        # First try exact match
-        for uname, user_data in BANK_DATA['users'].items():
-            if uname.lower() == username_lower:
-                return user_data
+    def check_password(password: str, stored_password: str) -> bool:
+        """Check a password against any stored format (current, legacy PBKDF2, SHA-256, plaintext)"""
+        if stored_password.startswith(PASSWORD_ALGORITHM + '$'):
+            try:
+                _, iterations, salt, _ = stored_password.split('$', 3)
+                candidate = CGBankDatabase.hash_password(password, int(iterations), salt)
+            except ValueError:
+                return False
+            return hmac.compare_digest(candidate, stored_password)
         
-        # Then try fuzzy matching for typos
-        matches = get_close_matches(username_lower, [u.lower() for u in BANK_DATA['users'].keys()], n=1, cutoff=0.7)
-        if matches:
-            matched_username = matches[0]
-            for uname, user_data in BANK_DATA['users'].items():
-                if uname.lower() == matched_username:
-                    return user_data
+        if re.fullmatch(r'[0-9a-f]{64}', stored_password):
+            # Older accounts hold either a bare SHA-256 or a PBKDF2 hash with the global salt
+            sha256_hash = hashlib.sha256(password.encode('utf-8')).hexdigest()
+            if hmac.compare_digest(sha256_hash, stored_password):
+                return True
+            legacy_hash = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'),
+                                              LEGACY_PASSWORD_SALT.encode('utf-8'),
+                                              LEGACY_PASSWORD_ITERATIONS).hex()
+            return hmac.compare_digest(legacy_hash, stored_password)
         
-        return None
+        # Plaintext passwords from the original demo data
+        return hmac.compare_digest(password.encode('utf-8'), stored_password.encode('utf-8'))
     
     @staticmethod
-    def verify_user(username: str, password: str) -> bool:
-        """Verify user credentials with brute force protection"""
-        # Simple rate limiting (in a real app, use proper rate limiting)
-        if 'login_attempts' not in st.session_state:
-            st.session_state.login_attempts = 0
-            st.session_state.last_attempt = datetime.now()
-        
-        if (datetime.now() - st.session_state.last_attempt).seconds < 5:
-            st.session_state.login_attempts += 1
-        else:
-            st.session_state.login_attempts = 1
-            st.session_state.last_attempt = datetime.now()
+    def password_needs_upgrade(stored_password: str) -> bool:
+        """Check whether a stored hash uses an old format or a lower cost than configured"""
+        parts = stored_password.split('$')
+        if parts[0] != PASSWORD_ALGORITHM or len(parts) != 4:
+            return True
+        try:
+            return int(parts[1]) < PASSWORD_ITERATIONS
+        except ValueError:
+            return True
+    
+    @staticmethod
+    def _get_user_key(username: str) -> Optional[str]:
+        """Get the stored key for a username (case-insensitive, via the store's username index)"""
+        return DATA_STORE.find_user_key(username)
+    
+    @staticmethod
+    def get_user(username: str) -> Optional[Dict[str, Any]]:
+        """Get user data by username with case-insensitive exact matching"""
+        user_key = CGBankDatabase._get_user_key(username)
+        return DATA_STORE.get_user(user_key) if user_key else None
+    
+    @staticmethod
+    def find_similar_usernames(username: str, limit: int = 3) -> List[str]:
+        """Get existing usernames within a small edit distance of a possible typo (never used to log in)"""
+        matches = DATA_STORE.search_index.search_usernames(normalize_username(username), max_distance=2,
+                                                           limit=limit)
+        return [match['id'] for match in matches]
+    
+    @staticmethod
+    def search_customers(query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Search customers by name, email or phone with typo tolerance"""
+        matches = DATA_STORE.search_index.search_customers(query.strip().casefold(), max_distance=2,
+                                                           limit=limit, substring=True)
+        results = []
+        for match in matches:
+            user = DATA_STORE.get_user(match['id'])
+            if user:
+                results.append({
+                    'username': match['id'],
+                    'name': user.get('name', ''),
+                    'email': user.get('email', user.get('contact', '')),
+                    'phone': user.get('phone', ''),
+                    'account_number': user.get('account_number', ''),
+                    'matched': match['term']
+                })
+        return results
+    
+    @staticmethod
+    def is_admin(username: str) -> bool:
+        """Check whether a user may use the admin tools (the account type, never the username)"""
+        user = CGBankDatabase.get_user(username)
+        return bool(user) and user.get('account_type') == 'Admin Account'
+    
+    @staticmethod
+    def verify_user(username: str, password: str, client_id: Optional[str] = None) -> bool:
+        """Verify user credentials with brute force protection
         
-        if st.session_state.login_attempts > 3:
-            st.error("Too many login attempts. Please try again later.")
-            return False
+        Raises LoginRateLimitedError when the username or client is over its login rate,
+        and ServerBusyError when the password hashing pool is saturated.
+        """
+        # Server-wide rate limiting, checked before any password hashing
+        if not get_login_rate_limiter().allow(username, client_id):
+            raise LoginRateLimitedError("Too many login attempts")
         
-        user = CGBankDatabase.get_user(username)
-        if not user:
+        user_key = CGBankDatabase._get_user_key(username)
+        if not user_key:
             return False
+        user = DATA_STORE.get_user(user_key)
         
         # Get the hashed password from user data
         stored_password = user.get('password')
         if not stored_password:
             return False
             
-        # Hash the provided password and compare
-        hashed_password = CGBankDatabase.hash_password(password)
-        return stored_password == hashed_password
+        # Check the provided password on the worker pool
+        hasher = get_password_hasher()
+        if not hasher.run(CGBankDatabase.check_password, password, stored_password):
+            return False
+        
+        # Transparently move old formats and cheaper hashes to the current format
+        if CGBankDatabase.password_needs_upgrade(stored_password):
+            try:
+                upgraded_password = hasher.run(CGBankDatabase.hash_password, password)
+                CGBankDatabase._persist(DATA_STORE.update_user, user_key, 'password', upgraded_password)
+            except ServerBusyError:
+                pass  # Upgrade on a later login
+        return True
     
     @staticmethod
     def create_user(username: str, password: str, user_data: Dict[str, Any]) -> bool:
-        """Create a new user account with validation"""
+        """Create a new user account with validation
+        
+        Raises ServerBusyError when the password hashing pool is saturated.
+        """
         if CGBankDatabase.get_user(username):
             return False  # User already exists
             
@@ -619,6 +1169,11 @@ class CGBankDatabase:
             st.error("Username must be 4-20 characters (letters, numbers, underscores)")
             return False
         
+        # Admin rights come from the account type, so signups can never choose it
+        if user_data.get('account_type') == 'Admin Account':
+            st.error("Invalid account type")
+            return False
+        
         # Validate password strength
         if len(password) < 8:
             st.error("Password must be at least 8 characters")
@@ -634,7 +1189,7 @@ class CGBankDatabase:
             return False
         
         # Hash the password before storing
-        user_data['password'] = CGBankDatabase.hash_password(password)
+        user_data['password'] = get_password_hasher().run(CGBankDatabase.hash_password, password)
         
         # Generate account number
         user_data['account_number'] = str(random.randint(1000000000, 9999999999))
@@ -656,15 +1211,13 @@ class CGBankDatabase:
         }
         
         # Store the user data
-        BANK_DATA['users'][username.lower()] = user_data
-        
-        # Save to JSON file
-        return CGBankDatabase._save_data()
+        return CGBankDatabase._persist(DATA_STORE.put_user, username.lower(), user_data)
     
     @staticmethod
     def get_bank_info() -> Dict[str, Any]:
         """Get enhanced bank information"""
-        info = BANK_DATA['bank_info']
+        # Work on a copy so the stored catalog (and its version hash) stays unchanged
+        info = dict(BANK_DATA['bank_info'])
         info['services'] = [
             "Personal Banking",
             "Business Banking",
@@ -679,6 +1232,13 @@ class CGBankDatabase:
         info['branch_locations'] = BANK_DATA.get('branch_locations', [])
         return info
     
+    @staticmethod
+    def get_catalog_version() -> str:
+        """Get a content hash of the catalog data used to build the bot knowledge base"""
+        catalog = {key: BANK_DATA.get(key) for key in CATALOG_KEYS}
+        payload = json.dumps(catalog, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
     @staticmethod
     def get_loan_products() -> Dict[str, Any]:
         """Get loan products with enhanced details"""
@@ -695,66 +1255,17 @@ class CGBankDatabase:
         return BANK_DATA.get('bank_accounts', {})
     
     @staticmethod
-    def get_user_transactions(username: str, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get transaction history for a user with categorization"""
-        user = CGBankDatabase.get_user(username)
-        if not user:
+    def get_user_transactions(username: str, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        """Get a page of a user's transaction ledger, most recent first"""
+        user_key = CGBankDatabase._get_user_key(username)
+        if not user_key:
             return []
-        
-        # Get transactions from session state if available
-        if 'transactions' in st.session_state and st.session_state.transactions:
-            return st.session_state.transactions[:limit]
-        
-        # Otherwise generate new transactions with categories
-        transactions = []
-        categories = [
-            'Shopping', 'Food & Dining', 'Utilities', 
-            'Transfer', 'Salary', 'Entertainment',
-            'Healthcare', 'Education', 'Travel'
-        ]
-        
-        for txn in BANK_DATA['transactions_history']:
-            # Determine category based on description
-            desc = txn['name'].lower()
-            if 'salary' in desc:
-                category = 'Salary'
-            elif any(word in desc for word in ['transfer', 'send', 'received']):
-                category = 'Transfer'
-            elif any(word in desc for word in ['electric', 'water', 'gas', 'bill']):
-                category = 'Utilities'
-            elif any(word in desc for word in ['food', 'restaurant', 'coffee', 'dining']):
-                category = 'Food & Dining'
-            elif any(word in desc for word in ['movie', 'concert', 'game', 'entertain']):
-                category = 'Entertainment'
-            elif any(word in desc for word in ['medical', 'hospital', 'pharmacy']):
-                category = 'Healthcare'
-            elif any(word in desc for word in ['school', 'college', 'tuition', 'education']):
-                category = 'Education'
-            elif any(word in desc for word in ['flight', 'hotel', 'travel', 'vacation']):
-                category = 'Travel'
-            elif any(word in desc for word in ['amazon', 'flipkart', 'shopping', 'store']):
-                category = 'Shopping'
-            else:
-                category = 'Other'
-            
-            transaction = {
-                'date': datetime.now() - timedelta(days=random.randint(1, 90)),
-                'description': txn['name'],
-                'amount': txn['amt'],
-                'balance': user['balance'] - random.uniform(0, 1000),
-                'category': category
-            }
-            transactions.append(transaction)
-        
-        # Sort by date and store in session state
-        transactions = sorted(transactions, key=lambda x: x['date'], reverse=True)
-        st.session_state.transactions = transactions
-        return transactions[:limit]
+        return DATA_STORE.list_ledger(user_key, limit, offset)
     
     @staticmethod
     def get_user_bills(username: str) -> List[Dict[str, Any]]:
         """Get bills for a user with enhanced data"""
-        return BANK_DATA['bills']
+        return DATA_STORE.list_bills()
     
     @staticmethod
     def get_spending_categories(username: str) -> List[Dict[str, Any]]:
@@ -773,69 +1284,38 @@ class CGBankDatabase:
         # Convert to list of dicts
         return [{'name': k, 'amount': v} for k, v in categories.items()]
     
+    @staticmethod
+    def categorize_transaction(description: str) -> str:
+        """Get the spending category for a transaction description"""
+        return get_transaction_categorizer(get_category_rules_json()).categorize(description)
+    
+    @staticmethod
+    def categorize_transactions(descriptions: List[str]) -> List[str]:
+        """Get spending categories for a batch of transaction descriptions"""
+        return get_transaction_categorizer(get_category_rules_json()).categorize_many(descriptions)
+    
     @staticmethod
     def add_transaction(username: str, description: str, amount: float) -> bool:
         """Add a new transaction with validation and categorization"""
-        user = CGBankDatabase.get_user(username)
-        if not user:
+        user_key = CGBankDatabase._get_user_key(username)
+        if not user_key:
             return False
         
         # Validate amount
         if amount == 0:
             return False
         
-        # Get current transactions
-        transactions = CGBankDatabase.get_user_transactions(username)
-        
         # Determine category
-        desc = description.lower()
-        if 'salary' in desc:
-            category = 'Salary'
-        elif any(word in desc for word in ['transfer', 'send', 'received']):
-            category = 'Transfer'
-        elif any(word in desc for word in ['electric', 'water', 'gas', 'bill']):
-            category = 'Utilities'
-        elif any(word in desc for word in ['food', 'restaurant', 'coffee', 'dining']):
-            category = 'Food & Dining'
-        elif any(word in desc for word in ['movie', 'concert', 'game', 'entertain']):
-            category = 'Entertainment'
-        elif any(word in desc for word in ['medical', 'hospital', 'pharmacy']):
-            category = 'Healthcare'
-        elif any(word in desc for word in ['school', 'college', 'tuition', 'education']):
-            category = 'Education'
-        elif any(word in desc for word in ['flight', 'hotel', 'travel', 'vacation']):
-            category = 'Travel'
-        elif any(word in desc for word in ['amazon', 'flipkart', 'shopping', 'store']):
-            category = 'Shopping'
-        else:
-            category = 'Other'
+        category = CGBankDatabase.categorize_transaction(description)
         
-        # Create new transaction
+        # Update the balance and record the transaction (with its running balance) in the ledger
         new_transaction = {
-            'date': datetime.now(),
+            'date': datetime.now().isoformat(timespec='seconds'),
             'description': description,
             'amount': amount,
-            'balance': user['balance'] + amount,
             'category': category
         }
-        
-        # Insert at beginning of list (most recent first)
-        transactions.insert(0, new_transaction)
-        
-        # Update user balance
-        user['balance'] += amount
-        
-        # Add to transactions_history in BANK_DATA
-        BANK_DATA['transactions_history'].append({
-            'name': description,
-            'amt': amount
-        })
-        
-        # Update session state
-        st.session_state.transactions = transactions
-        
-        # Save to JSON file
-        return CGBankDatabase._save_data()
+        return CGBankDatabase._persist(DATA_STORE.post_transaction, user_key, new_transaction)
     
     @staticmethod
     def add_bill_payment(username: str, bill_name: str, amount: float) -> bool:
@@ -850,10 +1330,7 @@ class CGBankDatabase:
             return False
         
         # Remove paid bill from bills list
-        BANK_DATA['bills'] = [bill for bill in BANK_DATA['bills'] if bill['name'] != bill_name]
-        
-        # Save to JSON file
-        return CGBankDatabase._save_data()
+        return CGBankDatabase._persist(DATA_STORE.remove_bills, bill_name)
     
     @staticmethod
     def add_new_bill(username: str, bill_data: Dict[str, Any]) -> bool:
@@ -863,24 +1340,21 @@ class CGBankDatabase:
             return False
         
         # Add to bills list
-        BANK_DATA['bills'].append(bill_data)
-        
-        # Save to JSON file
-        return CGBankDatabase._save_data()
+        return CGBankDatabase._persist(DATA_STORE.add_bill, bill_data)
     
     @staticmethod
     def update_user_balance(username: str, amount: float) -> bool:
         """Update user balance with validation"""
-        user = CGBankDatabase.get_user(username)
-        if not user:
+        user_key = CGBankDatabase._get_user_key(username)
+        if not user_key:
             return False
+        user = DATA_STORE.get_user(user_key)
         
         # Validate balance won't go negative (unless it's a credit account)
         if user['balance'] + amount < 0 and user.get('account_type') != 'Current Account':
             return False
         
-        user['balance'] += amount
-        return CGBankDatabase._save_data()
+        return CGBankDatabase._persist(DATA_STORE.update_user, user_key, 'balance', user['balance'] + amount)
     
     @staticmethod
     def request_new_account(account_data: Dict[str, Any]) -> bool:
@@ -898,10 +1372,7 @@ class CGBankDatabase:
             account_data['request_date'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             
             # Add to account requests
-            BANK_DATA['account_requests'].append(account_data)
-            
-            # Save to JSON file
-            return CGBankDatabase._save_data()
+            return CGBankDatabase._persist(DATA_STORE.add_account_request, account_data)
         except Exception as e:
             print(f"Error saving account request: {e}")
             return False
@@ -922,9 +1393,547 @@ class CGBankDatabase:
             return [branch for branch in branches if branch.get('zipcode') == zipcode]
         return branches
 
+class ResponseCache:
+    """Thread-safe LRU cache for bot answers built only from catalog data.
+    
+    Every lookup carries the current catalog version; when it differs from the
+    version the entries were stored under, the whole cache is dropped first.
+    """
+    
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def _check_version(self, version: str):
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+    
+    def get(self, version: str, key: Any) -> Any:
+        """Get a cached value, or None"""
+        with self._lock:
+            self._check_version(version)
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, version: str, key: Any, value: Any):
+        """Store a value, evicting the least recently used entry when full"""
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit and miss counts since the bot started"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': self.hits / total if total else 0.0}
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count, about four characters per token for English text"""
+    return len(text) // 4 + 1
+
+class KnowledgeIndex:
+    """In-memory TF-IDF index over short knowledge-base passages.
+    
+    The passages are a few dozen one-line facts, so a sparse matrix product
+    against every row is the whole search.
+    """
+    
+    def __init__(self, passages: List[str], min_score: float = KNOWLEDGE_MIN_SCORE):
+        self.passages = passages
+        self.min_score = min_score
+        self.vectorizer = TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, stop_words='english')
+        self.matrix = self.vectorizer.fit_transform(passages)
+    
+    def search(self, query: str, k: int = KNOWLEDGE_TOP_K) -> List[Tuple[str, float]]:
+        """The k passages most similar to the query, best first, skipping unrelated ones"""
+        scores = (self.matrix @ self.vectorizer.transform([query]).T).toarray().ravel()
+        return [(self.passages[i], float(scores[i])) for i in np.argsort(-scores)[:k]
+                if scores[i] >= self.min_score]
+
+class SemanticCache:
+    """LLM answers to free-form questions, looked up by question similarity.
+    
+    Questions are embedded in the intent classifier's hashed word and character
+    n-gram space and compared by cosine, so rewordings, typos and punctuation
+    still hit. Questions must also mention the same numbers, since "emi for 10
+    lakh" and "emi for 20 lakh" are close in that space. Entries expire after
+    ttl seconds and the least recently used one is evicted when full.
+    """
+    NUMBERS = re.compile(r'\d+(?:[.,]\d+)*')
+    
+    def __init__(self, threshold: float = LLM_CACHE_THRESHOLD, ttl: float = LLM_CACHE_TTL_SECONDS,
+                 max_entries: int = LLM_CACHE_SIZE):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # question -> [vector, numbers, answer, stored at, last used]; rows of _matrix follow this order
+        self._entries: Dict[str, List[Any]] = {}
+        self._matrix: Optional[sparse.csr_matrix] = None
+        self._keys: List[str] = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+    
+    @staticmethod
+    def _embed(question: str) -> sparse.csr_matrix:
+        return normalize(IntentClassifier.features([question]))
+    
+    def _evict_expired(self, now: float):
+        stale = [q for q, entry in self._entries.items() if now - entry[3] > self.ttl]
+        for question in stale:
+            del self._entries[question]
+        if stale:
+            self.expired += len(stale)
+            self._matrix = None
+    
+    def get(self, question: str) -> Optional[str]:
+        """Answer of the most similar cached question above the threshold, or None"""
+        vector = self._embed(question)
+        numbers = self.NUMBERS.findall(question)
+        with self._lock:
+            now = time.monotonic()
+            self._evict_expired(now)
+            if self._entries:
+                if self._matrix is None:
+                    self._keys = list(self._entries)
+                    self._matrix = sparse.vstack([entry[0] for entry in self._entries.values()], format='csr')
+                similarities = (self._matrix @ vector.T).toarray().ravel()
+                for index in np.argsort(-similarities):
+                    if similarities[index] < self.threshold:
+                        break
+                    entry = self._entries[self._keys[index]]
+                    if entry[1] == numbers:
+                        entry[4] = now
+                        self.hits += 1
+                        return entry[2]
+            self.misses += 1
+            return None
+    
+    def put(self, question: str, answer: str):
+        """Cache an answer, evicting the least recently used entry when full"""
+        vector, numbers = self._embed(question), self.NUMBERS.findall(question)
+        with self._lock:
+            now = time.monotonic()
+            self._entries[question.strip().lower()] = [vector, numbers, answer, now, now]
+            while len(self._entries) > self.max_entries:
+                del self._entries[min(self._entries, key=lambda q: self._entries[q][4])]
+            self._matrix = None
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit, miss and expiry counts since the bot started"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                    'expired': self.expired, 'hit_rate': self.hits / total if total else 0.0}
+
+class LLMStream:
+    """Tokens of one streaming Ollama generation, with a hard deadline and cancellation.
+    
+    A reader thread drains the HTTP stream into a queue, so the consumer can give
+    up at the deadline even while the server has not sent anything. Leaving the
+    iteration early (or calling cancel) stops the reader and closes the stream.
+    
+    on_finish gets the outcome as soon as it is known, possibly at the deadline while
+    the reader is still blocked; on_close runs only once the reader has exited.
+    """
+    
+    def __init__(self, open_stream: Callable[[], Iterator[Dict[str, Any]]], timeout: float = LLM_TIMEOUT_SECONDS,
+                 on_finish: Optional[Callable[[Optional[BaseException]], None]] = None,
+                 on_close: Optional[Callable[[], None]] = None):
+        self.started = time.monotonic()
+        self.deadline = self.started + timeout
+        self.first_token_at: Optional[float] = None
+        self.timed_out = False
+        self._tokens: queue.Queue = queue.Queue()
+        self._cancelled = threading.Event()
+        self._on_finish = on_finish
+        self._on_close = on_close
+        self._finished = False
+        self._finish_lock = threading.Lock()
+        threading.Thread(target=self._read, args=(open_stream,), daemon=True, name="llm-stream").start()
+    
+    def _read(self, open_stream: Callable[[], Iterator[Dict[str, Any]]]):
+        stream = None
+        try:
+            stream = open_stream()
+            for chunk in stream:
+                if self._cancelled.is_set():
+                    break
+                # Read through the final 'done' chunk to the end of the body, so the
+                # connection goes back to the pool instead of being dropped
+                self._tokens.put(('token', chunk['response']))
+        except Exception as e:
+            self._finish(e)
+            self._tokens.put(('error', e))
+        finally:
+            try:
+                if hasattr(stream, 'close'):
+                    stream.close()
+                self._finish(None)
+            finally:
+                if self._on_close:
+                    self._on_close()
+                self._tokens.put(('end', None))
+    
+    def _finish(self, error: Optional[BaseException]):
+        """Report the outcome to on_finish, once, from whichever side ends first"""
+        with self._finish_lock:
+            if self._finished:
+                return
+            self._finished = True
+        if self._on_finish:
+            self._on_finish(error)
+    
+    def cancel(self):
+        """Stop reading; the stream is closed as soon as the reader wakes up"""
+        self._cancelled.set()
+    
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        return self.first_token_at - self.started if self.first_token_at else None
+    
+    def __iter__(self) -> Iterator[str]:
+        try:
+            while not self._cancelled.is_set():
+                remaining = self.deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timed_out = True
+                    # A server that streams slowly still works; one that never answered does not
+                    self._finish(TimeoutError("No response before the deadline") if self.first_token_at is None else None)
+                    return
+                try:
+                    kind, value = self._tokens.get(timeout=remaining)
+                except queue.Empty:
+                    continue
+                if kind == 'end':
+                    return
+                if kind == 'error':
+                    raise value
+                if value:
+                    if self.first_token_at is None:
+                        self.first_token_at = time.monotonic()
+                    yield value
+        finally:
+            self.cancel()
+
+class LLMUnavailableError(Exception):
+    """Raised when the LLM circuit breaker is open and the call is not attempted"""
+
+class CircuitBreaker:
+    """Stops calling a failing dependency for a cooldown period.
+    
+    After failure_threshold consecutive failures the circuit opens and allow()
+    refuses calls. Once the cooldown has passed one trial call is let through
+    (half open); its success closes the circuit and its failure reopens it.
+    """
+    
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURES, cooldown: float = LLM_BREAKER_COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+    
+    def allow(self) -> bool:
+        """Whether a call may be made now"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = 'half_open'
+                return True
+            # Open, or half open with the trial call still running
+            return False
+    
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self.state = 'closed'
+    
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == 'half_open' or self._failures >= self.failure_threshold:
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+
+class OllamaClient:
+    """Process-wide Ollama client for the LLM fallback.
+    
+    Every session shares one pooled HTTP client, so keep-alive connections are
+    reused instead of reconnecting per message. At most max_concurrent calls are
+    in flight, each with an overall deadline, and a circuit breaker stops calling
+    a server that keeps failing or timing out.
+    """
+    
+    def __init__(self, host: Optional[str] = None, max_concurrent: int = LLM_MAX_CONCURRENT,
+                 connect_timeout: float = LLM_CONNECT_TIMEOUT, read_timeout: float = LLM_TIMEOUT_SECONDS,
+                 breaker: Optional[CircuitBreaker] = None):
+        self._client = ollama.Client(
+            host=host,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_concurrent, max_keepalive_connections=max_concurrent)
+        )
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self.breaker = breaker or CircuitBreaker()
+    
+    def generate_stream(self, prompt: str, options: Dict[str, Any], timeout: float = LLM_TIMEOUT_SECONDS,
+                        queue_timeout: float = 1.0) -> LLMStream:
+        """Start a streaming generation.
+        
+        Raises ServerBusyError when no call slot frees up within queue_timeout, and
+        LLMUnavailableError while the circuit breaker is open.
+        """
+        if not self._slots.acquire(timeout=queue_timeout):
+            raise ServerBusyError("Too many LLM requests in progress")
+        if not self.breaker.allow():
+            self._slots.release()
+            raise LLMUnavailableError("LLM circuit breaker is open")
+        
+        def finished(error: Optional[BaseException]):
+            if error is None:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+        
+        try:
+            # The slot is held until the reader thread exits, not just until the deadline, so
+            # hung requests still count against max_concurrent until their read timeout
+            return LLMStream(lambda: self._client.generate(model=LLM_MODEL, prompt=prompt, stream=True,
+                                                           options=options, keep_alive=LLM_KEEP_ALIVE),
+                             timeout, on_finish=finished, on_close=self._slots.release)
+        except Exception:
+            self._slots.release()
+            raise
+    
+    def warm_up(self, prefix: str = "") -> bool:
+        """Load the model and keep it resident; with a prefix, also prefill the KV cache for it"""
+        try:
+            # An empty prompt only loads the model
+            self._client.generate(model=LLM_MODEL, prompt="", keep_alive=LLM_KEEP_ALIVE)
+            if prefix:
+                self._client.generate(model=LLM_MODEL, prompt=prefix, keep_alive=LLM_KEEP_ALIVE,
+                                      options={'num_predict': 1})
+            return True
+        except Exception as e:
+            print(f"Ollama warm-up failed: {e}")
+            return False
+
+@st.cache_resource
+def get_llm_client() -> OllamaClient:
+    """Get the process-wide Ollama client"""
+    return OllamaClient()
+
+class MessageContext:
+    """One bot turn: the message parsed by spaCy once, plus everything derived from it.
+
+    Every stage of RexaBot.process_message (personal query check, intent, entities,
+    amount and date filters) reads from this object instead of parsing again. The
+    intent profile runs up front; the NER profile only runs if a stage asks for it.
+    """
+
+    def __init__(self, text: str, doc: Optional[Doc] = None):
+        self.text = text
+        self.lower = text.lower()
+        self.doc = doc if doc is not None else get_nlp_batcher('intent').parse(text, timeout=NLP_PARSE_TIMEOUT)
+        self._entity_doc: Optional[Doc] = None
+        self.cache: Dict[str, Any] = {}  # per-turn results (intent, entities) keyed by stage
+
+    @property
+    def entity_doc(self) -> Doc:
+        """The message parsed with the NER profile, on first access"""
+        if self._entity_doc is None:
+            self._entity_doc = get_nlp_batcher('entities').parse(self.text, timeout=NLP_PARSE_TIMEOUT)
+        return self._entity_doc
+
+class IntentClassifier:
+    """Hashed word and character n-gram features with a multinomial logistic regression.
+    
+    Hashing needs no fitted vocabulary, and misspellings still share most of
+    their character n-grams with the training utterances. Logits are divided by
+    a temperature fitted on cross-validated predictions, so the softmax
+    probability is calibrated and can be thresholded directly.
+    """
+    WORD_FEATURES = HashingVectorizer(ngram_range=(1, 2), n_features=2 ** 16, alternate_sign=False)
+    CHAR_FEATURES = HashingVectorizer(analyzer='char_wb', ngram_range=(2, 4), n_features=2 ** 16,
+                                      alternate_sign=False)
+    
+    def __init__(self, classes: List[str], weights: sparse.csr_matrix, intercept: np.ndarray,
+                 temperature: float = 1.0):
+        self.classes = classes
+        # Features x intents in CSR, so scoring is one row-major sparse product; used as
+        # given, so weights loaded memory-mapped stay memory-mapped
+        self._weights = weights
+        self.intercept = intercept
+        self.temperature = temperature
+    
+    @property
+    def coef(self) -> sparse.csc_matrix:
+        """Intents x features weights (a transposed view, no copy)"""
+        return self._weights.T
+    
+    @classmethod
+    def features(cls, texts: List[str]) -> sparse.csr_matrix:
+        """Word uni/bigrams and character 2-4 grams of the lowercased texts"""
+        texts = [text.lower() for text in texts]
+        return sparse.hstack([cls.WORD_FEATURES.transform(texts),
+                              cls.CHAR_FEATURES.transform(texts)], format='csr')
+    
+    @classmethod
+    def train(cls, texts: List[str], labels: List[str], C: float = 10.0) -> 'IntentClassifier':
+        """Fit the model, then the temperature on 5-fold out-of-fold logits"""
+        features = cls.features(texts)
+        y = np.array(labels)
+        # Fit only on the hash buckets that occur in training (a few thousand of 131k);
+        # every other bucket would keep a zero weight anyway, so this is exact and much faster
+        used = np.unique(features.indices)
+        X = features[:, used]
+        model = LogisticRegression(C=C, max_iter=2000)
+        
+        folds = StratifiedKFold(n_splits=5, shuffle=True, random_state=0)
+        logits = cross_val_predict(model, X, y, cv=folds, method='decision_function')
+        target = np.searchsorted(np.unique(y), y)
+        
+        def nll(temperature):
+            return -log_softmax(logits / temperature, axis=1)[np.arange(len(y)), target].mean()
+        temperature = minimize_scalar(nll, bounds=(0.05, 20.0), method='bounded').x
+        
+        model.fit(X, y)
+        weights = sparse.csr_matrix(model.coef_)
+        coef = sparse.csr_matrix((weights.data, used[weights.indices], weights.indptr),
+                                 shape=(len(model.classes_), features.shape[1]))
+        return cls(list(model.classes_), coef.T.tocsr(), model.intercept_, float(temperature))
+    
+    def predict_proba(self, texts: List[str]) -> np.ndarray:
+        """Calibrated probability of every intent, one row per text"""
+        logits = (self.features(texts) @ self._weights).toarray() + self.intercept
+        return softmax(logits / self.temperature, axis=1)
+    
+    def classify(self, texts: List[str], threshold: float = 0.0) -> List[Tuple[Optional[str], float]]:
+        """Best intent and its confidence per text; the intent is None below the threshold"""
+        probabilities = self.predict_proba(texts)
+        best = probabilities.argmax(axis=1)
+        return [(self.classes[b] if probabilities[row, b] >= threshold else None, float(probabilities[row, b]))
+                for row, b in enumerate(best)]
+
+class IntentModelArtifact:
+    """The trained intent classifier, saved to disk for instant startup.
+    
+    The features x intents CSR arrays that scoring multiplies by are stored as
+    .npy files and wrapped without copying when loaded memory-mapped, so every
+    server process shares the same pages. meta.json is written last and carries the
+    training data hash; a missing or stale meta.json means the model must be retrained.
+    """
+    ARRAYS = ('weights_data', 'weights_indices', 'weights_indptr', 'intercept')
+    FORMAT = 2  # bumped when the saved arrays change, so older artifacts are retrained
+    
+    def __init__(self, path: str):
+        self.path = Path(path)
+    
+    @staticmethod
+    def training_hash(texts: List[str], labels: List[str]) -> str:
+        """Version of the training data and features; any change retrains"""
+        payload = json.dumps({'texts': texts, 'labels': labels, 'sklearn': sklearn.__version__,
+                              'format': IntentModelArtifact.FORMAT,
+                              'word': IntentClassifier.WORD_FEATURES.get_params(),
+                              'char': IntentClassifier.CHAR_FEATURES.get_params()},
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def load(self, expected_hash: str) -> Optional[IntentClassifier]:
+        """Load the classifier if it exists and matches the training data hash"""
+        try:
+            meta = json.loads((self.path / 'meta.json').read_text(encoding='utf-8'))
+            if meta.get('training_hash') != expected_hash:
+                return None
+            arrays = {name: np.load(self.path / f'{name}.npy', mmap_mode='r') for name in self.ARRAYS}
+        except (OSError, ValueError):
+            return None
+        
+        weights = sparse.csr_matrix((arrays['weights_data'], arrays['weights_indices'], arrays['weights_indptr']),
+                                    shape=tuple(meta['weights_shape']), copy=False)
+        return IntentClassifier(meta['classes'], weights, arrays['intercept'], meta['temperature'])
+    
+    def save(self, training_hash: str, classifier: IntentClassifier):
+        """Write the artifact, each file atomically and meta.json last"""
+        self.path.mkdir(parents=True, exist_ok=True)
+        weights = classifier._weights
+        arrays = {'weights_data': weights.data, 'weights_indices': weights.indices,
+                  'weights_indptr': weights.indptr, 'intercept': classifier.intercept}
+        for name, array in arrays.items():
+            with open(self.path / f'{name}.npy.tmp', 'wb') as f:
+                np.save(f, np.ascontiguousarray(array))
+            os.replace(self.path / f'{name}.npy.tmp', self.path / f'{name}.npy')
+        
+        meta = {'training_hash': training_hash, 'classes': classifier.classes,
+                'weights_shape': list(classifier._weights.shape), 'temperature': classifier.temperature,
+                'built_at': datetime.now().isoformat()}
+        (self.path / 'meta.json.tmp').write_text(json.dumps(meta), encoding='utf-8')
+        os.replace(self.path / 'meta.json.tmp', self.path / 'meta.json')
+
 class RexaBot:
     """Enhanced CGBank intelligent banking assistant with advanced NLP capabilities"""
     
+    # Banking entity patterns, compiled once; spaCy NER only runs for slots these leave empty
+    AMOUNT = r'(?:₹|rs\.?|inr)?\s*([\d,]+\.?\d*)'
+    ENTITY_PATTERNS = {
+        'account_types': re.compile(r'\b(student|nri|senior|savings|current|business)\s?accounts?\b', re.IGNORECASE),
+        'loan_types': re.compile(r'\b(home|personal|car|auto|education|student|business)\s?loans?\b', re.IGNORECASE),
+        'scheme_names': re.compile(r'\b(pm kisan|pm svanidhi|standup india|mudra)\b', re.IGNORECASE),
+        'amounts': re.compile(r'(?:₹|\brs\.?|\binr)\s*(\d[\d,]*(?:\.\d+)?)'
+                              r'|\b(\d[\d,]*(?:\.\d+)?)\s*(lakhs?|crores?|rupees|rs\b|inr\b)', re.IGNORECASE),
+        'dates': DateRangeParser.PATTERN,
+        'time_periods': re.compile(r'\b\d{1,2}(?::\d{2})?\s*(?:am|pm)\b', re.IGNORECASE),
+        'pincodes': re.compile(r'\b\d{6}\b'),
+    }
+    AMOUNT_MULTIPLIERS = {'lakh': 100000, 'lakhs': 100000, 'crore': 10000000, 'crores': 10000000}
+    AMOUNT_FILTER_PATTERNS = {
+        'greater_than': re.compile(r'(?:greater than|more than|above|over|higher than)\s*' + AMOUNT, re.IGNORECASE),
+        'less_than': re.compile(r'(?:less than|below|under|lower than)\s*' + AMOUNT, re.IGNORECASE),
+        'between': re.compile(r'between\s*' + AMOUNT + r'\s*(?:and|to)\s*' + AMOUNT, re.IGNORECASE),
+        'exact_amount': re.compile(r'(?:exactly|precisely|amount of)\s*' + AMOUNT, re.IGNORECASE)
+    }
+    # Entity slots an intent's answer actually uses; NER is only worth running to fill these
+    INTENT_SLOTS = {
+        'atm_info': ('locations',),
+    }
+    
+    # Byte-identical start of every LLM prompt, so the model server reuses its KV cache for it;
+    # everything that varies per message goes after it
+    LLM_PROMPT_PREFIX = (
+        "You are Rexa, an AI banking assistant for CGBank (Coimbatore Trusted Banking Partner).\n"
+        "Your role is to provide accurate, helpful, and professional banking services to customers.\n"
+        "\n"
+        "**Response Guidelines:**\n"
+        "1. Be professional yet friendly (use \"you\" and \"we\" appropriately)\n"
+        "2. Provide accurate information from the CGBank information given below\n"
+        "3. If unsure, ask clarifying questions\n"
+        "4. Keep responses concise (100-200 words max)\n"
+        "5. Use Markdown formatting for better readability\n"
+        "6. For account-specific queries, verify user is logged in\n"
+        "7. Highlight important numbers/rates in bold\n"
+        "8. End with a helpful follow-up question or suggestion\n"
+        "9. Never share sensitive information without verification\n"
+        "10. For complex queries, suggest contacting branch or customer support\n"
+        "\n"
+    )
+    
     def __init__(self):
         self.name = "Rexa"
         self.version = "2.1"
@@ -1036,55 +2045,51 @@ class RexaBot:
         }
         
         self.knowledge_base = self._create_knowledge_base()
-        self.vectorizer = TfidfVectorizer()
+        self.knowledge_index = KnowledgeIndex(self._knowledge_passages())
         self._train_similarity_model()
-        self._setup_nlp_pipeline()
+        self.location_pattern = self._compile_location_pattern()
+        self._entity_paths = Counter()
+        self._entity_paths_lock = threading.Lock()
+        # (intent, resolved entity) -> answer, and normalized question -> (intent, resolved entity)
+        self.answer_cache = ResponseCache()
+        self.route_cache = ResponseCache(max_entries=4096)
+        self.llm_client = get_llm_client()
+        self.llm_cache = SemanticCache()
     
-    def _setup_nlp_pipeline(self):
-        """Set up custom NLP pipeline components"""
-        # Add sentiment analysis if not already present
-        if not nlp.has_pipe('sentiment'):
-            try:
-                from textblob import TextBlob
-                def sentiment_component(doc):
-                    blob = TextBlob(doc.text)
-                    doc._.polarity = blob.sentiment.polarity
-                    doc._.subjectivity = blob.sentiment.subjectivity
-                    return doc
-                
-                nlp.add_pipe(sentiment_component, name='sentiment', last=True)
-            except:
-                pass
+    def _train_similarity_model(self, rebuild: bool = False):
+        """Load the persisted intent classifier, retraining only when the training data changed"""
+        texts, labels = self.training_examples()
+        training_hash = IntentModelArtifact.training_hash(texts, labels)
+        artifact = IntentModelArtifact(INTENT_MODEL_DIR)
+        
+        self.intent_classifier = None if rebuild else artifact.load(training_hash)
+        if self.intent_classifier:
+            return
+        
+        self.intent_classifier = IntentClassifier.train(texts, labels)
+        try:
+            artifact.save(training_hash, self.intent_classifier)
+        except OSError as e:
+            print(f"Could not save intent model to {INTENT_MODEL_DIR}: {e}")
     
-    def _train_similarity_model(self):
-        """Train a TF-IDF model for similarity matching with enhanced corpus"""
-        # Create a corpus of all possible questions and keywords
-        corpus = []
+    def training_examples(self) -> Tuple[List[str], List[str]]:
+        """Labeled training data: every service keyword plus the utterance corpus"""
+        texts, labels = [], []
         for intent, keywords in self.service_keywords.items():
-            corpus.extend(keywords)
-            corpus.append(intent)
-        
-        # Add more natural language variations
-        corpus.extend([
-            "how can I check my current account balance",
-            "where is the closest CGBank ATM location to me",
-            "what are the current interest rates for savings accounts",
-            "how do I transfer money to another person's account",
-            "I've lost my debit card what should I do now",
-            "what documents are required to open a new bank account",
-            "what is the process to apply for a home loan",
-            "what government schemes are available for farmers",
-            "how can I generate my monthly account statement",
-            "what is the customer support phone number for CGBank",
-            "can you help me understand my spending patterns",
-            "what are the benefits of a senior citizen account",
-            "how do I activate my new debit card",
-            "what is the daily withdrawal limit at ATMs",
-            "how can I improve my financial health"
-        ])
-        
-        # Train the vectorizer
-        self.vectorizer.fit(corpus)
+            texts.extend(keywords)
+            labels.extend([intent] * len(keywords))
+        
+        try:
+            with open(INTENT_UTTERANCES_PATH, encoding='utf-8') as f:
+                utterances = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not read {INTENT_UTTERANCES_PATH}, training on keywords only: {e}")
+            utterances = {}
+        for intent, examples in utterances.items():
+            texts.extend(examples)
+            labels.extend([intent] * len(examples))
+        
+        return texts, labels
     
     def _create_knowledge_base(self) -> Dict[str, Any]:
         """Create a structured knowledge base from the JSON data with enhanced information"""
@@ -1185,6 +2190,44 @@ class RexaBot:
         }
         return kb
     
+    def _knowledge_passages(self) -> List[str]:
+        """Split the knowledge base into one-line passages for retrieval; the first is a bank overview"""
+        kb = self.knowledge_base
+        bank = kb['bank']
+        
+        def describe(name: str, details: Dict[str, Any]) -> str:
+            facts = []
+            for key, value in details.items():
+                if key == 'name':
+                    continue
+                if isinstance(value, list):
+                    value = ", ".join(str(v) for v in value)
+                facts.append(f"{key.replace('_', ' ')}: {value}")
+            return f"{name} - " + "; ".join(facts)
+        
+        passages = [
+            f"{bank['name']} ({bank['tagline']}) offers {', '.join(kb['services'])}",
+            f"{bank['name']} contact - address: {bank['address']}; phone: {bank['contact']}; "
+            f"email: {bank['email']}; 24x7 helpline: {bank['helpline']}",
+        ]
+        for group in ('accounts', 'loans', 'schemes'):
+            passages.extend(describe(item['name'], item) for item in kb[group].values())
+        passages.extend(describe(f"{branch['name']} branch", branch) for branch in kb['branches'])
+        passages.extend(describe(f"ATM at {atm['location']}", atm) for atm in kb['atm_locations'])
+        passages.append(describe("Debit and credit card services", kb['card_services']))
+        
+        rates = kb['interest_rates']
+        passages.append(f"Savings account interest rate: {rates['savings']}% p.a.")
+        passages.append("Fixed deposit (FD) interest rates by tenure: " +
+                        ", ".join(f"{tenure} {rate}%" for tenure, rate in rates['fixed_deposit'].items()))
+        passages.append("Loan interest rates: " +
+                        ", ".join(f"{loan} loan {rate}%" for loan, rate in rates['loan'].items()))
+        passages.extend(describe(f"{product['name']} investment", product) for product in kb['investment_products'])
+        passages.append("Security tips: " + "; ".join(kb['security_info']['tips']))
+        passages.append("Fraud prevention: " + "; ".join(kb['security_info']['fraud_prevention']))
+        passages.append("Financial planning tips: " + "; ".join(kb['financial_tips']))
+        return passages
+    
     def _get_random_response(self, response_type: str) -> str:
         """Get a random response of a given type with more variations"""
         responses = {
@@ -1509,180 +2552,250 @@ class RexaBot:
             print(f"Error creating download link: {e}")
             return "Error generating download link"
     
-    def _get_ollama_response(self, message: str, context: str = "") -> str:
-        """Get a response from Ollama LLM with enhanced banking context"""
+    def _build_llm_prompt(self, message: str, context: str = "") -> str:
+        """Prompt for the LLM fallback, grounded in the knowledge-base passages most relevant to the message
+        
+        Passages are added best match first while the prompt fits LLM_PROMPT_TOKEN_BUDGET.
+        """
+        # The question itself may use at most half of the budget
+        message = message[:LLM_PROMPT_TOKEN_BUDGET * 2]
+        budget = LLM_PROMPT_TOKEN_BUDGET - estimate_tokens(self._format_llm_prompt(message, context, ""))
+        
+        passages = [passage for passage, _ in self.knowledge_index.search(message)]
+        if not passages:
+            passages = self.knowledge_index.passages[:1]
+        knowledge = []
+        for passage in passages:
+            cost = estimate_tokens(passage) + 1
+            if cost > budget:
+                break
+            knowledge.append(f"- {passage}")
+            budget -= cost
+        return self._format_llm_prompt(message, context, "\n".join(knowledge))
+    
+    def _format_llm_prompt(self, message: str, context: str, knowledge: str) -> str:
+        """Stable prefix first, then the per-message knowledge, customer context and query"""
+        prompt = self.LLM_PROMPT_PREFIX + f"**Relevant CGBank Information:**\n{knowledge}\n\n"
+        if context:
+            prompt += f"**Current Context:**\n{context}\n\n"
+        return prompt + f"**Customer Query:**\n{message}\n\n**Response:**\n"
+    
+    def stream_ollama_response(self, message: str, context: str = "",
+                               timeout: float = LLM_TIMEOUT_SECONDS) -> LLMStream:
+        """Start a streaming Ollama generation; iterate the result for tokens as they arrive"""
+        return self.llm_client.generate_stream(
+            self._build_llm_prompt(message, context),
+            options={
+                'temperature': 0.7,
+                'num_predict': 300,
+                'top_p': 0.9,
+                'frequency_penalty': 0.5,
+                'presence_penalty': 0.5
+            },
+            timeout=timeout
+        )
+    
+    @staticmethod
+    def _clean_llm_response(text: str) -> str:
+        """Tidy whitespace and markdown in generated text"""
+        cleaned_response = text.strip()
+        cleaned_response = re.sub(r'\n{3,}', '\n\n', cleaned_response)  # Remove excessive newlines
+        cleaned_response = cleaned_response.replace("** ", "**").replace(" **", "**")  # Fix markdown formatting
+        return cleaned_response
+    
+    def _get_ollama_response(self, message: str, context: str = "",
+                             on_token: Optional[Callable[[str], None]] = None) -> str:
+        """Get a response from Ollama LLM with enhanced banking context
+        
+        on_token is called with the text generated so far after every token.
+        """
+        # General questions repeat in different words; answers with customer data are never shared
+        if not context:
+            cached = self.llm_cache.get(message)
+            if cached:
+                if on_token:
+                    on_token(cached)
+                return cached
+        
         try:
-            # Prepare the prompt with banking context and guidelines
-            prompt = f"""
-            You are Rexa, an AI banking assistant for CGBank (Coimbatore Trusted Banking Partner). 
-            Your role is to provide accurate, helpful, and professional banking services to customers.
-            
-            **Current Context:**
-            {context}
-            
-            **Knowledge Base Summary:**
-            - Bank Name: CGBank
-            - Services: Personal Banking, Business Banking, Loans, Investments
-            - Account Types: {', '.join([a['name'] for a in self.knowledge_base['accounts'].values()])}
-            - Loan Products: {', '.join([l['name'] for l in self.knowledge_base['loans'].values()])}
-            
-            **Customer Query:**
-            {message}
-            
-            **Response Guidelines:**
-            1. Be professional yet friendly (use "you" and "we" appropriately)
-            2. Provide accurate information from the knowledge base
-            3. If unsure, ask clarifying questions
-            4. Keep responses concise (100-200 words max)
-            5. Use Markdown formatting for better readability
-            6. For account-specific queries, verify user is logged in
-            7. Highlight important numbers/rates in bold
-            8. End with a helpful follow-up question or suggestion
-            9. Never share sensitive information without verification
-            10. For complex queries, suggest contacting branch or customer support
-            
-            **Response:**
-            """
-            
-            response = ollama.generate(
-                model='banking-assistant',
-                prompt=prompt,
-                options={
-                    'temperature': 0.7,
-                    'max_tokens': 300,
-                    'top_p': 0.9,
-                    'frequency_penalty': 0.5,
-                    'presence_penalty': 0.5
-                }
-            )
-            
-            # Post-process the response
-            cleaned_response = response['choices'][0]['text'].strip()
-            cleaned_response = re.sub(r'\n{3,}', '\n\n', cleaned_response)  # Remove excessive newlines
-            cleaned_response = cleaned_response.replace("** ", "**").replace(" **", "**")  # Fix markdown formatting
+            stream = self.stream_ollama_response(message, context)
+            text = ""
+            try:
+                for token in stream:
+                    text += token
+                    if on_token:
+                        on_token(text)
+            finally:
+                # A rerun or page change interrupts on_token; stop generating for nobody
+                stream.cancel()
             
+            cleaned_response = self._clean_llm_response(text)
+            if stream.timed_out:
+                print(f"Ollama response timed out after {time.monotonic() - stream.started:.1f}s")
+                if not cleaned_response:
+                    return ("I'm taking too long to answer that right now. Please try again in a moment "
+                            "or contact our customer support.")
+                cleaned_response += "\n\n*(Answer cut short - please ask again for more detail.)*"
+            elif not cleaned_response:
+                # The stream ended without any text
+                return "I'm having trouble processing your request. Please try again later or contact our customer support."
+            elif not context:
+                self.llm_cache.put(message, cleaned_response)
             return cleaned_response
+        except (LLMUnavailableError, ServerBusyError) as e:
+            # The model server is failing or saturated: answer now instead of waiting on it
+            print(f"Skipping Ollama: {e}")
+            return self._get_random_response('fallback')
         except Exception as e:
             print(f"Error getting Ollama response: {e}")
             return "I'm having trouble processing your request. Please try again later or contact our customer support."
     
-    def _identify_intent(self, message: str) -> Optional[str]:
+    def _identify_intent(self, ctx: MessageContext) -> Optional[str]:
         """Enhanced intent identification with NLP and context awareness"""
-        message = message.lower()
-        doc = nlp(message)
-        
-        # Check for greetings first
-        if any(token.text.lower() in ['hello', 'hi', 'hey', 'greetings'] for token in doc[:3]):
-            return 'greeting'
-        
-        # Check for thanks
-        if any(token.text.lower() in ['thanks', 'thank', 'appreciate'] for token in doc):
-            return 'thanks'
-        
-        # Preprocess the message with lemmatization and stopword removal
-        processed_message = " ".join([token.lemma_ for token in doc 
-                                     if not token.is_stop and not token.is_punct])
+        if 'intent' not in ctx.cache:
+            ctx.cache['intent'] = self._classify_contexts([ctx])[0]
+        return ctx.cache['intent']
+    
+    def identify_intents(self, messages: List[str]) -> List[Optional[str]]:
+        """Identify intents for a batch of messages with one feature pass and one matrix product"""
+        return self._classify_contexts([MessageContext(message, doc)
+                                        for message, doc in zip(messages, get_nlp('intent').pipe(messages))])
+    
+    def _classify_contexts(self, contexts: List[MessageContext]) -> List[Optional[str]]:
+        """Classify parsed messages, recording each calibrated confidence in its context"""
+        intents: List[Optional[str]] = [None] * len(contexts)
+        pending = []
+        
+        for i, ctx in enumerate(contexts):
+            # Check for greetings first
+            if any(token.lower_ in ['hello', 'hi', 'hey', 'greetings'] for token in ctx.doc[:3]):
+                intents[i] = 'greeting'
+            # Check for thanks
+            elif any(token.lower_ in ['thanks', 'thank', 'appreciate'] for token in ctx.doc):
+                intents[i] = 'thanks'
+            else:
+                pending.append(i)
         
-        # Transform the message using TF-IDF
-        message_vec = self.vectorizer.transform([processed_message])
+        if not pending:
+            return intents
         
-        # Calculate similarity with all known intents
-        similarities = {}
-        for intent, keywords in self.service_keywords.items():
-            # Create a document for this intent by joining all keywords
-            intent_doc = " ".join(keywords)
-            intent_vec = self.vectorizer.transform([intent_doc])
-            
-            # Calculate cosine similarity
-            similarity = cosine_similarity(message_vec, intent_vec)[0][0]
-            similarities[intent] = similarity
-        
-        # Get the most similar intent
-        best_intent = max(similarities.items(), key=lambda x: x[1])
+        # Only return intents whose calibrated confidence is above threshold
+        results = self.intent_classifier.classify([contexts[i].text for i in pending],
+                                                  INTENT_CONFIDENCE_THRESHOLD)
+        for i, (intent, confidence) in zip(pending, results):
+            intents[i] = intent
+            contexts[i].cache['intent_confidence'] = confidence
         
-        # Only return if similarity is above threshold
-        if best_intent[1] > 0.4:
-            return best_intent[0]
+        return intents
+    
+    def _compile_location_pattern(self) -> Optional[re.Pattern]:
+        """One case-insensitive pattern for every place name in the branch and ATM data"""
+        places = set()
+        for branch in CGBankDatabase.get_bank_info().get('branches', []):
+            for part in re.split(r'[,-]', branch.get('address', '')):
+                place = re.sub(r'^[\d/\s]+', '', part).strip()
+                if place and not place.isdigit():
+                    places.add(place.lower())
+        for location in CGBankDatabase.get_atm_locations() + CGBankDatabase.get_branch_locations():
+            if location.get('location'):
+                places.add(location['location'].lower())
+        if not places:
+            return None
+        alternation = '|'.join(re.escape(place) for place in sorted(places, key=len, reverse=True))
+        return re.compile(r'\b(?:' + alternation + r')\b', re.IGNORECASE)
+    
+    def _extract_entities(self, ctx: MessageContext, required: Tuple[str, ...] = ()) -> Dict[str, Any]:
+        """Rule-first entity extraction: precompiled banking patterns, then NER for unfilled required slots"""
+        if 'entities' in ctx.cache:
+            entities = ctx.cache['entities']
+        else:
+            entities = self._match_entity_patterns(ctx.text)
+            ctx.cache['entities'] = entities
+            ctx.cache['entity_path'] = 'rules'
         
-        return None
+        if ctx.cache['entity_path'] == 'rules' and any(not entities[slot] for slot in required):
+            self._fill_entities_from_ner(ctx, entities)
+            ctx.cache['entity_path'] = 'ner'
+        return entities
     
-    def _extract_entities(self, message: str) -> Dict[str, Any]:
-        """Enhanced entity extraction with financial context"""
-        doc = nlp(message)
+    def _match_entity_patterns(self, message: str) -> Dict[str, Any]:
+        """Fill every slot the precompiled patterns can answer"""
+        patterns = self.ENTITY_PATTERNS
         entities = {
             'amounts': [],
-            'dates': [],
-            'account_types': [],
-            'loan_types': [],
-            'scheme_names': [],
-            'time_periods': [],
-            'locations': []
+            'dates': [match.group(0) for match in patterns['dates'].finditer(message)],
+            'account_types': [match.group(1) + " account" for match in patterns['account_types'].finditer(message)],
+            'loan_types': [match.group(1) + " loan" for match in patterns['loan_types'].finditer(message)],
+            'scheme_names': [match.group(0) for match in patterns['scheme_names'].finditer(message)],
+            'time_periods': [match.group(0) for match in patterns['time_periods'].finditer(message)],
+            'locations': [match.group(0) for match in patterns['pincodes'].finditer(message)]
         }
+        if self.location_pattern:
+            entities['locations'].extend(match.group(0) for match in self.location_pattern.finditer(message))
         
-        # Extract entities using spaCy NER and pattern matching
-        for ent in doc.ents:
+        for match in patterns['amounts'].finditer(message):
+            try:
+                if match.group(1):
+                    entities['amounts'].append(float(match.group(1).replace(',', '')))
+                else:
+                    multiplier = self.AMOUNT_MULTIPLIERS.get(match.group(3).lower(), 1)
+                    entities['amounts'].append(float(match.group(2).replace(',', '')) * multiplier)
+            except ValueError:
+                pass
+        return entities
+    
+    def _fill_entities_from_ner(self, ctx: MessageContext, entities: Dict[str, Any]):
+        """Run spaCy NER and add what it finds to the slots the patterns left empty"""
+        found = {slot: [] for slot in entities}
+        for ent in ctx.entity_doc.ents:
             if ent.label_ == 'MONEY':
                 # Extract numerical value from money string
                 amount = re.search(r'[\d,]+\.?\d*', ent.text)
                 if amount:
                     try:
-                        amount_value = float(amount.group().replace(',', ''))
-                        entities['amounts'].append(amount_value)
+                        found['amounts'].append(float(amount.group().replace(',', '')))
                     except ValueError:
                         pass
             elif ent.label_ == 'DATE':
-                entities['dates'].append(ent.text)
+                found['dates'].append(ent.text)
             elif ent.label_ == 'ORG' or ent.label_ == 'PRODUCT':
                 # Account types
-                if 'account' in message.lower():
-                    entities['account_types'].append(ent.text)
+                if 'account' in ctx.lower:
+                    found['account_types'].append(ent.text)
                 # Loan types
-                elif 'loan' in message.lower():
-                    entities['loan_types'].append(ent.text)
+                elif 'loan' in ctx.lower:
+                    found['loan_types'].append(ent.text)
                 # Scheme names
-                elif 'scheme' in message.lower() or 'program' in message.lower():
-                    entities['scheme_names'].append(ent.text)
+                elif 'scheme' in ctx.lower or 'program' in ctx.lower:
+                    found['scheme_names'].append(ent.text)
             elif ent.label_ == 'GPE' or ent.label_ == 'LOC':
-                entities['locations'].append(ent.text)
+                found['locations'].append(ent.text)
             elif ent.label_ == 'TIME':
-                entities['time_periods'].append(ent.text)
-        
-        # Additional pattern matching for banking-specific entities
-        # Account types
-        account_pattern = r'\b(student|nri|senior|savings|current|business)\s?account\b'
-        matches = re.finditer(account_pattern, message, re.IGNORECASE)
-        for match in matches:
-            entities['account_types'].append(match.group(1) + " account")
+                found['time_periods'].append(ent.text)
         
-        # Loan types
-        loan_pattern = r'\b(home|personal|car|auto|education|student|business)\s?loan\b'
-        matches = re.finditer(loan_pattern, message, re.IGNORECASE)
-        for match in matches:
-            entities['loan_types'].append(match.group(1) + " loan")
-        
-        # Government schemes
-        scheme_pattern = r'\b(pm kisan|pm svanidhi|standup india|mudra)\b'
-        matches = re.finditer(scheme_pattern, message, re.IGNORECASE)
-        for match in matches:
-            entities['scheme_names'].append(match.group(0))
-        
-        return entities
+        for slot, values in found.items():
+            if not entities[slot]:
+                entities[slot].extend(values)
+    
+    def _record_entity_path(self, ctx: MessageContext):
+        """Count which path answered this turn's entity extraction"""
+        with self._entity_paths_lock:
+            self._entity_paths[ctx.cache['entity_path']] += 1
+    
+    def entity_path_stats(self) -> Dict[str, Any]:
+        """How often entity extraction was answered by patterns alone vs needed NER"""
+        with self._entity_paths_lock:
+            rules, ner = self._entity_paths['rules'], self._entity_paths['ner']
+        total = rules + ner
+        return {'rules': rules, 'ner': ner, 'ner_skip_rate': rules / total if total else 0.0}
     
     def _extract_amount_filters(self, message: str) -> Dict[str, float]:
         """Enhanced amount filter extraction with more patterns"""
         filters = {}
         
-        # Patterns to match
-        patterns = {
-            'greater_than': r'(?:greater than|more than|above|over|higher than)\s*(?:₹|rs\.?|inr)?\s*([\d,]+\.?\d*)',
-            'less_than': r'(?:less than|below|under|lower than)\s*(?:₹|rs\.?|inr)?\s*([\d,]+\.?\d*)',
-            'between': r'between\s*(?:₹|rs\.?|inr)?\s*([\d,]+\.?\d*)\s*(?:and|to)\s*(?:₹|rs\.?|inr)?\s*([\d,]+\.?\d*)',
-            'exact_amount': r'(?:exactly|precisely|amount of)\s*(?:₹|rs\.?|inr)?\s*([\d,]+\.?\d*)'
-        }
-        
         # Check for each pattern
-        for filter_type, pattern in patterns.items():
-            matches = re.search(pattern, message, re.IGNORECASE)
+        for filter_type, pattern in self.AMOUNT_FILTER_PATTERNS.items():
+            matches = pattern.search(message)
             if matches:
                 try:
                     if filter_type == 'between':
@@ -1705,89 +2818,10 @@ class RexaBot:
         
         return filters
     
-    def _extract_date_filters(self, message: str) -> Dict[str, datetime]:
-        """Enhanced date filter extraction with natural language support"""
-        filters = {}
-        doc = nlp(message)
-        
-        # Handle relative dates (last week, past month, etc.)
-        relative_dates = {
-            'today': datetime.now(),
-            'yesterday': datetime.now() - timedelta(days=1),
-            'last week': datetime.now() - timedelta(weeks=1),
-            'past week': datetime.now() - timedelta(weeks=1),
-            'last month': datetime.now() - timedelta(days=30),
-            'past month': datetime.now() - timedelta(days=30),
-            'last year': datetime.now() - timedelta(days=365),
-            'this month': datetime.now().replace(day=1),
-            'this year': datetime.now().replace(month=1, day=1)
-        }
-        
-        for term, date in relative_dates.items():
-            if term in message.lower():
-                if 'from' in message.lower() or 'since' in message.lower():
-                    filters['start_date'] = date
-                elif 'to' in message.lower() or 'until' in message.lower():
-                    filters['end_date'] = date
-                else:
-                    filters['start_date'] = date
-                    filters['end_date'] = datetime.now()
-        
-        # Extract explicit dates
-        date_ents = [ent for ent in doc.ents if ent.label_ == 'DATE']
-        parsed_dates = []
-        
-        for ent in date_ents:
-            try:
-                # Try to parse as absolute date
-                parsed_date = datetime.strptime(ent.text, '%d/%m/%Y')
-                parsed_dates.append(parsed_date)
-            except ValueError:
-                try:
-                    parsed_date = datetime.strptime(ent.text, '%d-%m-%Y')
-                    parsed_dates.append(parsed_date)
-                except ValueError:
-                    # Handle relative dates not in our dictionary
-                    if 'ago' in ent.text:
-                        try:
-                            num = int(re.search(r'\d+', ent.text).group())
-                            if 'day' in ent.text:
-                                parsed_dates.append(datetime.now() - timedelta(days=num))
-                            elif 'week' in ent.text:
-                                parsed_dates.append(datetime.now() - timedelta(weeks=num))
-                            elif 'month' in ent.text:
-                                parsed_dates.append(datetime.now() - timedelta(days=num*30))
-                            elif 'year' in ent.text:
-                                parsed_dates.append(datetime.now() - timedelta(days=num*365))
-                        except:
-                            pass
-        
-        # Sort dates and apply to filters
-        parsed_dates = sorted(parsed_dates)
-        
-        if 'from' in message.lower() and 'to' in message.lower():
-            if len(parsed_dates) >= 2:
-                filters['start_date'] = parsed_dates[0]
-                filters['end_date'] = parsed_dates[1]
-        elif 'from' in message.lower() or 'since' in message.lower():
-            if len(parsed_dates) >= 1:
-                filters['start_date'] = parsed_dates[0]
-        elif 'to' in message.lower() or 'until' in message.lower():
-            if len(parsed_dates) >= 1:
-                filters['end_date'] = parsed_dates[0]
-        elif 'between' in message.lower():
-            if len(parsed_dates) >= 2:
-                filters['start_date'] = parsed_dates[0]
-                filters['end_date'] = parsed_dates[1]
-        elif parsed_dates:
-            if len(parsed_dates) == 1:
-                filters['start_date'] = parsed_dates[0]
-                filters['end_date'] = datetime.now()
-            else:
-                filters['start_date'] = parsed_dates[0]
-                filters['end_date'] = parsed_dates[-1]
-        
-        return filters
+    def _extract_date_filters(self, ctx: MessageContext) -> Dict[str, datetime]:
+        """Date filters for the range the message mentions, if any"""
+        date_range = DateRangeParser.parse(ctx.text)
+        return date_range.as_filters() if date_range else {}
     
     def _filter_transactions(self, transactions: List[Dict[str, Any]], filters: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Enhanced transaction filtering with multiple criteria"""
@@ -1986,41 +3020,40 @@ class RexaBot:
         
         return response
     
-    def _is_personal_query(self, message: str) -> bool:
+    def _is_personal_query(self, ctx: MessageContext) -> bool:
         """Enhanced personal query detection with NLP"""
         personal_keywords = ['my', 'mine', 'account', 'balance', 'transactions', 
                            'statement', 'details', 'i', 'me']
         possessive_phrases = ["what's my", "what is my", "show my", "tell me my", 
                              "check my", "view my", "see my", "access my"]
         
-        message = message.lower()
+        message = ctx.lower
         
         # Check for possessive phrases
         if any(phrase in message for phrase in possessive_phrases):
             return True
         
-        # Check for personal keywords in context
-        doc = nlp(message)
-        for token in doc:
-            if (token.text.lower() in personal_keywords and 
-                token.dep_ in ('poss', 'attr', 'nsubj')):
+        # Check for personal keywords used as possessives or first-person subjects
+        # (tagger only: the intent profile does not load the dependency parser)
+        for token in ctx.doc:
+            if (token.lower_ in personal_keywords and 
+                (token.tag_ == 'PRP$' or token.lower_ in ('i', 'mine'))):
                 return True
         
         # Check for questions about the user
-        if any(token.tag_ == 'WP' for token in doc):  # WH-pronoun (who, what, etc.)
+        if any(token.tag_ == 'WP' for token in ctx.doc):  # WH-pronoun (who, what, etc.)
             if 'i' in message or 'me' in message:
                 return True
         
         return False
     
-    def _handle_personal_query(self, message: str, username: str) -> str:
+    def _handle_personal_query(self, ctx: MessageContext, username: str) -> str:
         """Handle personal account queries with enhanced responses"""
         user = CGBankDatabase.get_user(username)
         if not user:
             return "Please log in to access your account information."
         
-        intent = self._identify_intent(message)
-        entities = self._extract_entities(message)
+        intent = self._identify_intent(ctx)
         
         # Balance inquiry
         if intent == 'balance_inquiry':
@@ -2031,10 +3064,10 @@ class RexaBot:
         # Transaction history
         elif intent == 'transaction_history':
             # Check for transaction filters
-            amount_filters = self._extract_amount_filters(message)
-            date_filters = self._extract_date_filters(message)
+            amount_filters = self._extract_amount_filters(ctx.text)
+            date_filters = self._extract_date_filters(ctx)
             
-            # Get transactions from session state or database
+            # Get transactions from the ledger
             transactions = CGBankDatabase.get_user_transactions(username)
             
             # Apply filters if any
@@ -2100,7 +3133,124 @@ class RexaBot:
                "- Account services\n\n"
                "What would you like to know?")
     
-    def process_message(self, message: str, username: Optional[str] = None) -> str:
+    @staticmethod
+    def _normalize_question(message: str) -> str:
+        """Route cache key: lowercase, single spaces, no trailing punctuation"""
+        return re.sub(r'\s+', ' ', message.lower()).strip().rstrip('?!. ')
+    
+    def _static_answer_key(self, ctx: MessageContext, intent: Optional[str],
+                           entities: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+        """(intent, resolved entity) for answers built only from catalog data, else None"""
+        text = ctx.lower
+        
+        if intent in ('balance_inquiry', 'customer_support', 'interest_rates', 'security_info',
+                      'investment_info', 'financial_advice'):
+            return (intent, '')
+        
+        if intent == 'account_info':
+            if entities.get('account_types'):
+                return (intent, entities['account_types'][0].lower())
+            for word, account in [('student', 'student_account'), ('nri', 'nri_account'),
+                                  ('senior', 'senior_account'), ('current', 'current_account'),
+                                  ('regular', 'regular_savings_account')]:
+                if word in text:
+                    return (intent, account)
+            if any(word in text for word in ['create', 'open', 'new']):
+                return (intent, 'create')
+            return (intent, '')
+        
+        if intent == 'loan_info':
+            if entities.get('loan_types'):
+                return (intent, entities['loan_types'][0].lower())
+            for word, loan in [('home', 'home_loan'), ('personal', 'personal_loan'), ('car', 'car_loan'),
+                               ('education', 'education_loan'), ('business', 'business_loan')]:
+                if word in text:
+                    return (intent, loan)
+            return (intent, '')
+        
+        if intent == 'scheme_info':
+            if entities.get('scheme_names'):
+                return (intent, entities['scheme_names'][0].lower())
+            for word, scheme in [('kisan', 'pm_kisan_scheme'), ('svanidhi', 'pm_svanidhi_scheme'),
+                                 ('standup', 'standup_india_scheme'), ('mudra', 'mudra_loan_scheme')]:
+                if word in text:
+                    return (intent, scheme)
+            return (intent, '')
+        
+        if intent == 'atm_info':
+            return (intent, entities['locations'][0] if entities.get('locations') else '')
+        if intent == 'card_info':
+            # Card questions get the ATM answer, which contains the card services
+            return ('atm_info', '')
+        
+        if intent == 'bank_info':
+            if 'branch' in text or 'location' in text:
+                return (intent, 'branches')
+            elif 'service' in text or 'product' in text:
+                return (intent, 'services')
+            elif 'time' in text or 'hour' in text:
+                return (intent, 'timings')
+            return (intent, '')
+        
+        return None
+    
+    def _static_answer(self, catalog_version: str, key: Tuple[str, str]) -> str:
+        """Cached answer for an (intent, resolved entity) key, built on first use"""
+        answer = self.answer_cache.get(catalog_version, key)
+        if answer is None:
+            answer = self._build_static_answer(*key)
+            self.answer_cache.put(catalog_version, key, answer)
+        return answer
+    
+    def _build_static_answer(self, intent: str, entity: str) -> str:
+        """Build the markdown answer for a static intent from the catalog"""
+        if intent == 'balance_inquiry':
+            return ("To check your account balance, please log in to your account.\n\n"
+                   "For general information about account types and features, you can ask:\n"
+                   "- 'What types of accounts does CGBank offer?'\n"
+                   "- 'What is the minimum balance for a savings account?'")
+        elif intent == 'account_info':
+            if entity == 'create':
+                return self._get_account_creation_info()
+            return self._extract_account_info(entity) if entity else self._get_all_accounts_info()
+        elif intent == 'loan_info':
+            return self._extract_loan_info(entity) if entity else self._get_all_loans_info()
+        elif intent == 'scheme_info':
+            return self._extract_scheme_info(entity) if entity else self._get_all_schemes_info()
+        elif intent == 'atm_info':
+            return self._get_atm_info(entity or None)
+        elif intent == 'customer_support':
+            return self._get_customer_support_info()
+        elif intent == 'interest_rates':
+            return self._get_interest_rates_info()
+        elif intent == 'security_info':
+            return self._get_security_info()
+        elif intent == 'investment_info':
+            return self._get_investment_info()
+        elif intent == 'financial_advice':
+            return self._get_financial_advice()
+        
+        # Bank information
+        bank_info = CGBankDatabase.get_bank_info()
+        if entity == 'branches':
+            branches = "\n".join([f"- **{branch['name']}**: {branch['address']} ({branch.get('timings', '')})" 
+                                for branch in bank_info['branches'][:3]])
+            return f"**CGBank Branches:**\n{branches}"
+        elif entity == 'services':
+            services = "\n".join([f"- {service}" for service in bank_info['services']])
+            return f"**CGBank Services:**\n{services}"
+        elif entity == 'timings':
+            timings = bank_info['branches'][0]['timings']
+            return f"**Branch Timings:**\n{timings}"
+        return (f"**About {bank_info['name']}:**\n"
+               f"{bank_info['tagline']}\n\n"
+               f"**Address:** {bank_info['address']}\n"
+               f"**Contact:** {bank_info['contact']}\n"
+               f"**Email:** {bank_info['email']}\n"
+               f"**Helpline:** {bank_info['helpline']}")
+    
+    def process_message(self, message: str, username: Optional[str] = None,
+                        on_token: Optional[Callable[[str], None]] = None) -> str:
         """Enhanced message processing with context awareness and personalization"""
         message = message.strip()
         if not message:
@@ -2118,133 +3268,37 @@ class RexaBot:
         if any(word in message.lower() for word in ['thank', 'thanks', 'appreciate']):
             return self._get_random_response('thanks')
         
+        # Repeated FAQ-style questions go straight to the cached answer, without any NLP
+        catalog_version = CGBankDatabase.get_catalog_version()
+        question = self._normalize_question(message)
+        answer_key = self.route_cache.get(catalog_version, question)
+        if answer_key:
+            return self._static_answer(catalog_version, answer_key)
+        
+        # Parse once; every stage below reads from the same context
+        ctx = MessageContext(message)
+        
         # Check if this is a personal account query
-        is_personal = self._is_personal_query(message)
+        is_personal = self._is_personal_query(ctx)
         
         # Handle personal queries if user is logged in
         if is_personal and username:
-            return self._handle_personal_query(message, username)
+            return self._handle_personal_query(ctx, username)
         elif is_personal:
             return ("Please log in to access your personal account information.\n\n"
                    "I can still help with general banking questions about accounts, "
                    "loans, or other services.")
         
         # Identify intent for non-personal queries
-        intent = self._identify_intent(message)
-        entities = self._extract_entities(message)
-        
-        # Handle balance inquiries (non-personal)
-        if intent == 'balance_inquiry':
-            return ("To check your account balance, please log in to your account.\n\n"
-                   "For general information about account types and features, you can ask:\n"
-                   "- 'What types of accounts does CGBank offer?'\n"
-                   "- 'What is the minimum balance for a savings account?'")
-        
-        # Handle account information requests
-        elif intent == 'account_info':
-            if entities.get('account_types'):
-                account_type = entities['account_types'][0]
-                return self._extract_account_info(account_type)
-            elif any(word in message.lower() for word in ['student', 'nri', 'senior', 'regular', 'current']):
-                if 'student' in message.lower():
-                    return self._extract_account_info('student_account')
-                elif 'nri' in message.lower():
-                    return self._extract_account_info('nri_account')
-                elif 'senior' in message.lower():
-                    return self._extract_account_info('senior_account')
-                elif 'current' in message.lower():
-                    return self._extract_account_info('current_account')
-                else:
-                    return self._extract_account_info('regular_savings_account')
-            elif any(word in message.lower() for word in ['create', 'open', 'new']):
-                return self._get_account_creation_info()
-            else:
-                return self._get_all_accounts_info()
-        
-        # Handle loan information requests
-        elif intent == 'loan_info':
-            if entities.get('loan_types'):
-                return self._extract_loan_info(entities['loan_types'][0])
-            elif any(word in message.lower() for word in ['home', 'personal', 'car', 'education', 'business']):
-                if 'home' in message.lower():
-                    return self._extract_loan_info('home_loan')
-                elif 'personal' in message.lower():
-                    return self._extract_loan_info('personal_loan')
-                elif 'car' in message.lower() or 'auto' in message.lower():
-                    return self._extract_loan_info('car_loan')
-                elif 'education' in message.lower():
-                    return self._extract_loan_info('education_loan')
-                elif 'business' in message.lower():
-                    return self._extract_loan_info('business_loan')
-            else:
-                return self._get_all_loans_info()
-        
-        # Handle scheme information requests
-        elif intent == 'scheme_info':
-            if entities.get('scheme_names'):
-                return self._extract_scheme_info(entities['scheme_names'][0])
-            elif any(word in message.lower() for word in ['kisan', 'svanidhi', 'standup', 'mudra']):
-                if 'kisan' in message.lower():
-                    return self._extract_scheme_info('pm_kisan_scheme')
-                elif 'svanidhi' in message.lower():
-                    return self._extract_scheme_info('pm_svanidhi_scheme')
-                elif 'standup' in message.lower():
-                    return self._extract_scheme_info('standup_india_scheme')
-                elif 'mudra' in message.lower():
-                    return self._extract_scheme_info('mudra_loan_scheme')
-            else:
-                return self._get_all_schemes_info()
-        
-        # Handle ATM and card services
-        elif intent == 'atm_info':
-            if entities.get('locations'):
-                return self._get_atm_info(entities['locations'][0])
-            return self._get_atm_info()
+        intent = self._identify_intent(ctx)
+        entities = self._extract_entities(ctx, self.INTENT_SLOTS.get(intent, ()))
+        self._record_entity_path(ctx)
         
-        # Handle card services
-        elif intent == 'card_info':
-            return self._get_atm_info()  # Reusing the same function as it contains card info
-        
-        # Handle customer support
-        elif intent == 'customer_support':
-            return self._get_customer_support_info()
-        
-        # Handle interest rates
-        elif intent == 'interest_rates':
-            return self._get_interest_rates_info()
-        
-        # Handle security info
-        elif intent == 'security_info':
-            return self._get_security_info()
-        
-        # Handle investment info
-        elif intent == 'investment_info':
-            return self._get_investment_info()
-        
-        # Handle financial advice
-        elif intent == 'financial_advice':
-            return self._get_financial_advice()
-        
-        # Handle bank information
-        elif intent == 'bank_info':
-            bank_info = CGBankDatabase.get_bank_info()
-            if 'branch' in message.lower() or 'location' in message.lower():
-                branches = "\n".join([f"- **{branch['name']}**: {branch['address']} ({branch.get('timings', '')})" 
-                                    for branch in bank_info['branches'][:3]])
-                return f"**CGBank Branches:**\n{branches}"
-            elif 'service' in message.lower() or 'product' in message.lower():
-                services = "\n".join([f"- {service}" for service in bank_info['services']])
-                return f"**CGBank Services:**\n{services}"
-            elif 'time' in message.lower() or 'hour' in message.lower():
-                timings = bank_info['branches'][0]['timings']
-                return f"**Branch Timings:**\n{timings}"
-            else:
-                return (f"**About {bank_info['name']}:**\n"
-                       f"{bank_info['tagline']}\n\n"
-                       f"**Address:** {bank_info['address']}\n"
-                       f"**Contact:** {bank_info['contact']}\n"
-                       f"**Email:** {bank_info['email']}\n"
-                       f"**Helpline:** {bank_info['helpline']}")
+        # Answers built only from catalog data are cached per (intent, resolved entity)
+        answer_key = self._static_answer_key(ctx, intent, entities)
+        if answer_key:
+            self.route_cache.put(catalog_version, question, answer_key)
+            return self._static_answer(catalog_version, answer_key)
         
         # For all other queries, use Ollama with context
         context = ""
@@ -2252,16 +3306,40 @@ class RexaBot:
             user_data = CGBankDatabase.get_user(username)
             if user_data:
                 context = (f"Customer: {user_data['name']}\n"
-                          f"Account Type: {user_data['account_type']}\n"
-                          f"Last Login: {datetime.now().strftime('%Y-%m-%d')}")
+                          f"Account Type: {user_data['account_type']}")
         
-        return self._get_ollama_response(message, context)
+        return self._get_ollama_response(message, context, on_token)
+
+@st.cache_resource(show_spinner="Starting Rexa...", max_entries=1)
+def get_shared_bot(catalog_version: str) -> RexaBot:
+    """Build the process-wide RexaBot shared by every session.
+    
+    Streamlit runs the script again on every interaction, so the bot (knowledge base,
+    fitted TF-IDF model and NLP pipeline setup) is cached per server process and keyed
+    on the catalog version; it is only rebuilt when the catalog data actually changes.
+    """
+    return RexaBot()
+
+@st.cache_resource
+def start_llm_warm_up() -> threading.Thread:
+    """Once per server process, load the LLM and prefill the prompt prefix in the background,
+    so the first free-form question does not pay for the model load"""
+    thread = threading.Thread(target=get_llm_client().warm_up, args=(RexaBot.LLM_PROMPT_PREFIX,),
+                              daemon=True, name="llm-warm-up")
+    thread.start()
+    return thread
 
 class CGBankApp:
     """Enhanced Streamlit application for CGBank with improved UI/UX"""
     
     def __init__(self):
-        self.bot = RexaBot()
+        try:
+            get_nlp_batcher('intent')
+        except OSError as e:
+            st.error(str(e))
+            st.stop()
+        self.bot = get_shared_bot(CGBankDatabase.get_catalog_version())
+        start_llm_warm_up()
         self.feedback_system = FeedbackSystem()
         self._initialize_session_state()
         self._setup_page_config()
@@ -2275,12 +3353,9 @@ class CGBankApp:
             'page': "login",
             'bot_conversation': [],
             'show_popup_bot': False,
-            'transactions': [],
             'download_link': None,
             'feedback_submitted': False,
-            'show_create_account': False,
-            'login_attempts': 0,
-            'last_attempt': datetime.now()
+            'show_create_account': False
         }
         
         for key, value in session_defaults.items():
@@ -2656,6 +3731,26 @@ class CGBankApp:
             else:
                 self._render_login_form()
     
+    def _get_client_id(self) -> Optional[str]:
+        """Identify the client for rate limiting (peer IP or trusted forwarded IP, then session)"""
+        context = getattr(st, 'context', None)
+        if TRUSTED_PROXY_HOPS:
+            # Each trusted proxy appends its peer, so the client is that many entries from the
+            # right; anything further left was supplied by the client and cannot be trusted
+            headers = getattr(context, 'headers', None) or {}
+            forwarded_for = [ip.strip() for ip in headers.get('X-Forwarded-For', '').split(',') if ip.strip()]
+            if len(forwarded_for) >= TRUSTED_PROXY_HOPS:
+                return forwarded_for[-TRUSTED_PROXY_HOPS]
+        ip_address = getattr(context, 'ip_address', None)
+        if ip_address:
+            return ip_address
+        try:
+            from streamlit.runtime.scriptrunner import get_script_run_ctx
+            ctx = get_script_run_ctx()
+            return ctx.session_id if ctx else None
+        except Exception:
+            return None
+    
     def _render_login_form(self):
         """Render the enhanced login form with security features"""
         st.markdown("### Login to Your Account")
@@ -2684,29 +3779,24 @@ class CGBankApp:
                     st.error("Please enter both username and password!")
                     return
                 
-                # Simple rate limiting
-                if (datetime.now() - st.session_state.last_attempt).seconds < 5:
-                    st.session_state.login_attempts += 1
-                else:
-                    st.session_state.login_attempts = 1
-                    st.session_state.last_attempt = datetime.now()
-                
-                if st.session_state.login_attempts > 3:
-                    st.error("Too many login attempts. Please try again after 5 minutes.")
-                    return
-                
                 try:
                     # Verify user credentials
-                    if CGBankDatabase.verify_user(username, password):
+                    if CGBankDatabase.verify_user(username, password, self._get_client_id()):
                         st.session_state.logged_in = True
                         st.session_state.current_user = username.lower()
                         st.session_state.page = "dashboard"
-                        st.session_state.transactions = CGBankDatabase.get_user_transactions(username)
-                        st.session_state.login_attempts = 0
                         st.success("Login successful! Redirecting...")
                         st.rerun()
                     else:
                         st.error("Invalid username or password!")
+                        if not CGBankDatabase.get_user(username):
+                            suggestions = CGBankDatabase.find_similar_usernames(username)
+                            if suggestions:
+                                st.info(f"Did you mean: {', '.join(f'**{name}**' for name in suggestions)}?")
+                except LoginRateLimitedError:
+                    st.error("Too many login attempts. Please try again after a few minutes.")
+                except ServerBusyError:
+                    st.warning("We're handling a lot of logins right now. Please retry in a few seconds.")
                 except Exception as e:
                     st.error(f"An error occurred during login: {str(e)}")
             
@@ -2871,7 +3961,13 @@ class CGBankApp:
                 }
                 
                 # Create the user account
-                if CGBankDatabase.create_user(username, password, user_data):
+                try:
+                    created = CGBankDatabase.create_user(username, password, user_data)
+                except ServerBusyError:
+                    st.warning("We're handling a lot of requests right now. Please retry in a few seconds.")
+                    return
+                
+                if created:
                     st.session_state.show_create_account = False
                     st.success("""
                     🎉 Your account has been created successfully!
@@ -3063,10 +4159,8 @@ class CGBankApp:
         """Render the enhanced report analysis page"""
         st.markdown("### 📊 Financial Reports & Analysis")
         
-        if not st.session_state.transactions:
-            st.session_state.transactions = CGBankDatabase.get_user_transactions(st.session_state.current_user)
-        
-        df = pd.DataFrame(st.session_state.transactions)
+        transactions = CGBankDatabase.get_user_transactions(st.session_state.current_user)
+        df = pd.DataFrame(transactions)
         
         if df.empty or 'date' not in df.columns:
             st.warning("No transaction data available for analysis")
@@ -3247,10 +4341,7 @@ class CGBankApp:
             
             if submitted and user_input:
                 try:
-                    bot_response = self.bot.process_message(
-                        user_input, 
-                        st.session_state.current_user if st.session_state.logged_in else None
-                    )
+                    bot_response = self._stream_bot_reply(user_input, "bot-message", "🤖 Rexa:")
                     
                     st.session_state.bot_conversation.append({
                         'user': user_input,
@@ -3353,13 +4444,29 @@ class CGBankApp:
             </div>
             """, unsafe_allow_html=True)
     
+    def _stream_bot_reply(self, message: str, message_class: str, label: str) -> str:
+        """Get the bot's reply, showing an LLM answer token by token while it is generated"""
+        placeholder = st.empty()
+        
+        def show_partial(text: str):
+            placeholder.markdown(f"""
+            <div class="{message_class} markdown-text">
+                <strong>{label}</strong> {text}▌
+            </div>
+            """, unsafe_allow_html=True)
+        
+        reply = self.bot.process_message(
+            message,
+            st.session_state.current_user if st.session_state.logged_in else None,
+            on_token=show_partial
+        )
+        placeholder.empty()
+        return reply
+    
     def _handle_popup_action(self, message: str):
         """Handle an action from the popup bot"""
         try:
-            bot_response = self.bot.process_message(
-                message, 
-                st.session_state.current_user if st.session_state.logged_in else None
-            )
+            bot_response = self._stream_bot_reply(message, "popup-bot-message", "Rexa:")
             
             st.session_state.bot_conversation.append({
                 'user': message,
@@ -3394,6 +4501,8 @@ class CGBankApp:
                     ("📈 Reports", "reports"),
                     ("🤖 Rexa", "rexa")
                 ]
+                if CGBankDatabase.is_admin(st.session_state.current_user):
+                    nav_items.append(("🔎 Customer Search", "customer_search"))
                 
                 for item in nav_items:
                     if st.button(item[0], 
@@ -3426,12 +4535,35 @@ class CGBankApp:
                 st.markdown("[Open an Account](https://www.cgbank.com/open-account)")
                 st.markdown("[Explore Services](https://www.cgbank.com/services)")
     
+    def _render_customer_search_page(self):
+        """Render the admin customer search page"""
+        st.markdown("""
+        <div class="main-header">
+            <h1>🔎 Customer Search</h1>
+            <p>Find customers by name, email or phone number</p>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        if not CGBankDatabase.is_admin(st.session_state.current_user):
+            st.error("You do not have access to this page.")
+            return
+        
+        query = st.text_input("Search customers", placeholder="Name, email or phone number")
+        if not query:
+            return
+        
+        results = CGBankDatabase.search_customers(query)
+        if not results:
+            st.info("No matching customers found.")
+            return
+        
+        st.dataframe(pd.DataFrame(results), use_container_width=True, hide_index=True)
+    
     def _render_transactions_page(self):
         """Render the enhanced transactions page"""
         st.markdown("### 📋 Transaction History")
         
-        if not st.session_state.transactions:
-            st.session_state.transactions = CGBankDatabase.get_user_transactions(st.session_state.current_user)
+        transactions = CGBankDatabase.get_user_transactions(st.session_state.current_user)
         
         # Filter options
         st.markdown("#### Filter Transactions")
@@ -3445,14 +4577,14 @@ class CGBankApp:
         with col2:
             category_filter = st.selectbox("Category", 
                                          ["All"] + sorted(list(set(t.get('category', 'Other') 
-                                                                  for t in st.session_state.transactions))))
+                                                                  for t in transactions))))
         
         with col3:
             amount_filter = st.selectbox("Amount Range",
                                        ["All", "Less than ₹1,000", "₹1,000 - ₹5,000", "₹5,000 - ₹10,000", "Above ₹10,000"])
         
         # Apply filters
-        filtered_transactions = st.session_state.transactions.copy()
+        filtered_transactions = transactions.copy()
         
         # Date filter
         if date_filter == "Last 7 days":
@@ -3805,6 +4937,8 @@ class CGBankApp:
                 self._render_report_page()
             elif st.session_state.page == "rexa":
                 self._render_bot_page()
+            elif st.session_state.page == "customer_search":
+                self._render_customer_search_page()
         else:
             self._render_login_page()
 
@@ -0,0 +1,135 @@
+"""Offline evaluation of RexaBot's intent classifier.
+
+Usage: python evaluate_intents.py [--folds 5] [--threshold 0.35]
+
+Cross-validates over the labeled utterance corpus (intent_utterances.json):
+each fold trains on every service keyword plus the other folds' utterances and
+is scored on the held-out utterances. The old keyword cosine router is scored
+the same way as a baseline. Messages left without an intent fall back to the
+LLM, so coverage is the share of messages that avoid the slow Ollama path.
+"""
+import argparse
+from collections import defaultdict
+
+import numpy as np
+from scipy.special import softmax
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.model_selection import StratifiedKFold
+
+from cra import INTENT_CONFIDENCE_THRESHOLD, INTENT_UTTERANCES_PATH, IntentClassifier, RexaBot, get_nlp
+
+
+class KeywordCosineBaseline:
+    """The previous router: TF-IDF cosine of the lemmatized message against each intent's keywords"""
+
+    def __init__(self, service_keywords, phrases, threshold=0.4):
+        corpus = []
+        for intent, keywords in service_keywords.items():
+            corpus.extend(keywords)
+            corpus.append(intent)
+        corpus.extend(phrases)
+        self.vectorizer = TfidfVectorizer().fit(corpus)
+        self.intent_names = list(service_keywords)
+        self.intent_matrix = self.vectorizer.transform(
+            [" ".join(keywords) for keywords in service_keywords.values()]).T.tocsr()
+        self.threshold = threshold
+
+    def classify(self, texts):
+        lemmas = [" ".join(token.lemma_.lower() for token in doc if not token.is_stop and not token.is_punct)
+                  for doc in get_nlp('intent').pipe(texts)]
+        similarities = (self.vectorizer.transform(lemmas) @ self.intent_matrix).toarray()
+        best = similarities.argmax(axis=1)
+        return [(self.intent_names[b] if similarities[row, b] > self.threshold else None,
+                 float(similarities[row, b])) for row, b in enumerate(best)]
+
+
+def expected_calibration_error(confidences, correct, bins=10):
+    """Average gap between confidence and accuracy, weighted by bin size"""
+    confidences, correct = np.asarray(confidences), np.asarray(correct, dtype=float)
+    edges = np.linspace(0.0, 1.0, bins + 1)
+    error = 0.0
+    for low, high in zip(edges[:-1], edges[1:]):
+        in_bin = (confidences > low) & (confidences <= high)
+        if in_bin.any():
+            error += in_bin.mean() * abs(confidences[in_bin].mean() - correct[in_bin].mean())
+    return error
+
+
+def summarize(label, predictions, truth):
+    """Print accuracy, coverage and precision on answered messages"""
+    answered = [p is not None for p, _ in predictions]
+    correct = [p == t for (p, _), t in zip(predictions, truth)]
+    coverage = np.mean(answered)
+    precision = sum(correct) / max(sum(answered), 1)
+    print(f"{label:28s} accuracy {np.mean(correct):6.1%}   coverage {coverage:6.1%}   "
+          f"precision {precision:6.1%}   LLM fallbacks {1 - coverage:6.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-validate the intent classifier")
+    parser.add_argument('--folds', type=int, default=5, help="cross-validation folds")
+    parser.add_argument('--threshold', type=float, default=INTENT_CONFIDENCE_THRESHOLD,
+                        help="confidence threshold to evaluate")
+    args = parser.parse_args()
+
+    bot = RexaBot()
+    keyword_texts, keyword_labels = [], []
+    for intent, keywords in bot.service_keywords.items():
+        keyword_texts.extend(keywords)
+        keyword_labels.extend([intent] * len(keywords))
+    texts, labels = bot.training_examples()
+    utterances, truth = texts[len(keyword_texts):], labels[len(keyword_texts):]
+    print(f"{len(utterances)} utterances from {INTENT_UTTERANCES_PATH}, "
+          f"{len(keyword_texts)} keywords, {len(set(labels))} intents, {args.folds} folds\n")
+
+    classifier_out = [None] * len(utterances)
+    baseline_out = [None] * len(utterances)
+    folds = StratifiedKFold(n_splits=args.folds, shuffle=True, random_state=0)
+    for train, test in folds.split(utterances, truth):
+        model = IntentClassifier.train(keyword_texts + [utterances[i] for i in train],
+                                       keyword_labels + [truth[i] for i in train])
+        baseline = KeywordCosineBaseline(bot.service_keywords, [utterances[i] for i in train])
+        test_texts = [utterances[i] for i in test]
+        for i, probabilities, cosine in zip(test, model.predict_proba(test_texts), baseline.classify(test_texts)):
+            classifier_out[i] = (model.classes, probabilities, model.temperature)
+            baseline_out[i] = cosine
+
+    def at_threshold(threshold):
+        predictions = []
+        for classes, probabilities, _ in classifier_out:
+            best = int(probabilities.argmax())
+            predictions.append((classes[best] if probabilities[best] >= threshold else None,
+                                float(probabilities[best])))
+        return predictions
+
+    summarize("Keyword cosine (> 0.4)", baseline_out, truth)
+    predictions = at_threshold(args.threshold)
+    summarize(f"Classifier (>= {args.threshold:.2f})", predictions, truth)
+
+    print("\nThreshold sweep")
+    for threshold in [0.0, 0.2, 0.3, 0.35, 0.4, 0.5, 0.6, 0.7]:
+        summarize(f"  >= {threshold:.2f}", at_threshold(threshold), truth)
+
+    # Calibration: temperature-scaled confidences vs the raw softmax (temperature 1)
+    correct = [classes[int(p.argmax())] == expected for (classes, p, _), expected in zip(classifier_out, truth)]
+    calibrated = [float(p.max()) for _, p, _ in classifier_out]
+    raw = [float(softmax(np.log(p) * temperature).max()) for _, p, temperature in classifier_out]
+    print(f"\nExpected calibration error: {expected_calibration_error(calibrated, correct):.3f} "
+          f"(uncalibrated {expected_calibration_error(raw, correct):.3f})")
+
+    print("\nPer-intent recall at the chosen threshold")
+    hits, totals = defaultdict(int), defaultdict(int)
+    confusions = defaultdict(lambda: defaultdict(int))
+    for (predicted, _), expected in zip(predictions, truth):
+        totals[expected] += 1
+        hits[expected] += predicted == expected
+        if predicted != expected:
+            confusions[expected][predicted or 'LLM fallback'] += 1
+    for intent in sorted(totals):
+        worst = max(confusions[intent].items(), key=lambda x: x[1], default=None)
+        note = f"   most confused with {worst[0]} ({worst[1]})" if worst else ""
+        print(f"  {intent:22s} {hits[intent]:3d}/{totals[intent]:<3d}{note}")
+
+
+if __name__ == "__main__":
+    main()
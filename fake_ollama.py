@@ -0,0 +1,214 @@
+"""Stand-in Ollama server for exercising the LLM fallback without a model.
+
+Usage: python fake_ollama.py [--port 11434] [--first-token-ms 300] [--token-ms 20]
+                             [--tokens 40] [--mode ok|error|hang|drop]
+                             [--load-ms 0] [--prefill-ms 0]
+
+Serves /api/generate (streamed NDJSON, or one JSON object when stream is false),
+/api/tags and /api/version the way Ollama does. Latency and failures are fixed by
+the options, so timeouts and the circuit breaker can be reproduced exactly:
+
+    ok     stream tokens after the first-token delay
+    error  answer 500 with an Ollama error body
+    hang   accept the request and never answer
+    drop   close the connection without answering
+
+With --load-ms the model has to be loaded before the first answer and unloads
+again once the request's keep_alive has passed. With --prefill-ms every 100
+prompt characters cost that much before the first token, except the leading
+part shared with the previous prompt, mimicking Ollama's KV cache reuse.
+
+Run the app against it with OLLAMA_HOST=http://127.0.0.1:<port>.
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MODES = ('ok', 'error', 'hang', 'drop')
+DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+
+def keep_alive_seconds(value):
+    """Ollama keep_alive (seconds, or a duration such as '5m') in seconds; negative means forever"""
+    if value is None:
+        return 300.0
+    if isinstance(value, (int, float)):
+        return float('inf') if value < 0 else float(value)
+    match = re.fullmatch(r'(-?\d+(?:\.\d+)?)(ms|s|m|h)?', value.strip())
+    if not match:
+        return 300.0
+    seconds = float(match.group(1)) * DURATION_UNITS[match.group(2) or 's']
+    return float('inf') if seconds < 0 else seconds
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    """Threaded fake server; start() serves from a background thread"""
+    daemon_threads = True
+
+    def __init__(self, port=0, first_token_ms=300, token_ms=20, tokens=40, mode='ok', load_ms=0, prefill_ms=0):
+        super().__init__(('127.0.0.1', port), FakeOllamaHandler)
+        self.first_token_ms = first_token_ms
+        self.token_ms = token_ms
+        self.tokens = tokens
+        self.mode = mode
+        self.load_ms = load_ms
+        self.prefill_ms = prefill_ms
+        self.loaded_until = None
+        self.cached_prompt = ''
+        self.loads = 0
+        self.requests = 0
+        self.connections = set()
+        self.stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def record_request(self, client_address):
+        with self._lock:
+            self.requests += 1
+            self.connections.add(client_address)
+
+    def prepare(self, prompt, keep_alive):
+        """Seconds to wait before the first token: model load if unloaded, then prefill past the cached prefix"""
+        now = time.monotonic()
+        with self._lock:
+            delay = 0.0
+            if self.load_ms and (self.loaded_until is None or now > self.loaded_until):
+                delay += self.load_ms / 1000
+                self.loads += 1
+                self.cached_prompt = ''
+            self.loaded_until = now + delay + keep_alive_seconds(keep_alive)
+            shared = len(os.path.commonprefix([self.cached_prompt, prompt]))
+            delay += self.prefill_ms * (len(prompt) - shared) / 100 / 1000
+            if prompt:
+                self.cached_prompt = prompt
+            return delay
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True, name="fake-ollama").start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections open, so client-side connection reuse shows up in server.connections
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == '/api/version':
+            self._send_json(200, {'version': '0.0.0-fake'})
+        elif self.path == '/api/tags':
+            self._send_json(200, {'models': [{'name': 'banking-assistant:latest', 'model': 'banking-assistant:latest'}]})
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)) or 0)
+        if self.path != '/api/generate':
+            self._send_json(404, {'error': 'not found'})
+            return
+        self._generate(json.loads(body or b'{}'))
+
+    def _generate(self, request):
+        server = self.server
+        server.record_request(self.client_address)
+        model = request.get('model', 'banking-assistant')
+
+        if server.mode == 'error':
+            self._send_json(500, {'error': 'model runner has unexpectedly stopped'})
+            return
+        if server.mode == 'drop':
+            self.close_connection = True
+            return
+        if server.mode == 'hang':
+            server.stopping.wait()
+            self.close_connection = True
+            return
+
+        prompt = request.get('prompt') or ''
+        time.sleep(server.prepare(prompt, request.get('keep_alive')))
+        # An empty prompt only loads the model, as in Ollama
+        if not prompt:
+            self._send_json(200, {'model': model, 'response': '', 'done': True, 'done_reason': 'load'})
+            return
+
+        time.sleep(server.first_token_ms / 1000)
+        words = [f"word{i} " for i in range(server.tokens)]
+        if not request.get('stream', True):
+            time.sleep(server.token_ms * len(words) / 1000)
+            self._send_json(200, {'model': model, 'response': ''.join(words), 'done': True, 'done_reason': 'stop'})
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for i, word in enumerate(words):
+                if i:
+                    time.sleep(server.token_ms / 1000)
+                self._write_chunk({'model': model, 'response': word, 'done': False})
+            self._write_chunk({'model': model, 'response': '', 'done': True, 'done_reason': 'stop',
+                               'eval_count': len(words)})
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            # The client cancelled the stream
+            self.close_connection = True
+
+    def _write_chunk(self, part):
+        data = json.dumps(part).encode() + b'\n'
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b'\r\n')
+        self.wfile.flush()
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama server with fixed latency and failures")
+    parser.add_argument('--port', type=int, default=11434)
+    parser.add_argument('--first-token-ms', type=float, default=300, help="delay before the first token")
+    parser.add_argument('--token-ms', type=float, default=20, help="delay between tokens")
+    parser.add_argument('--tokens', type=int, default=40, help="tokens per answer")
+    parser.add_argument('--mode', choices=MODES, default='ok')
+    parser.add_argument('--load-ms', type=float, default=0, help="model load time when not resident")
+    parser.add_argument('--prefill-ms', type=float, default=0, help="prompt processing per 100 uncached characters")
+    args = parser.parse_args()
+
+    server = FakeOllamaServer(args.port, args.first_token_ms, args.token_ms, args.tokens, args.mode,
+                              args.load_ms, args.prefill_ms)
+    print(f"Fake Ollama ({args.mode}) listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
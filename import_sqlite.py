@@ -0,0 +1,43 @@
+"""Import the JSON bank data into the SQLite store.
+
+Usage: python import_sqlite.py [--replace] [json_path] [db_path]
+
+A database that already holds data is left untouched unless --replace is
+given, which deletes everything in it (including transactions and password
+upgrades the app wrote since the last import) before importing.
+
+Run the app against the imported database with CGBANK_STORAGE=sqlite
+(and CGBANK_DB_PATH if the database is not ./cgbank.db).
+"""
+import argparse
+import os
+import sys
+
+from storage import DatabaseNotEmptyError, SQLiteStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import the JSON bank data into the SQLite store")
+    parser.add_argument('json_path', nargs='?', default='dummydata.json')
+    parser.add_argument('db_path', nargs='?', default=os.environ.get('CGBANK_DB_PATH', 'cgbank.db'))
+    parser.add_argument('--replace', action='store_true', help="delete all existing data in the database first")
+    args = parser.parse_args()
+    
+    try:
+        counts, cleared = SQLiteStore(args.db_path).import_json(args.json_path, replace=args.replace)
+    except DatabaseNotEmptyError as e:
+        print(f"Not importing: {e}. Re-run with --replace to overwrite it.")
+        sys.exit(1)
+    if any(cleared.values()):
+        print(f"Replaced the existing data in {args.db_path}:")
+        for table, count in cleared.items():
+            print(f"  {table}: {count} deleted")
+    else:
+        print(f"{args.db_path} was empty")
+    print(f"Imported {args.json_path} into {args.db_path}:")
+    for table, count in counts.items():
+        print(f"  {table}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""Out-of-process spaCy parsing for cra.NLPBatcher.
+
+Kept apart from cra.py so that worker processes import spaCy only, not the
+Streamlit app and its data store.
+"""
+from typing import List
+
+import spacy
+from spacy.tokens import DocBin
+
+_pipeline = None
+
+
+def init_worker(model: str, exclude: List[str]):
+    """Load the pipeline once per worker process"""
+    global _pipeline
+    _pipeline = spacy.load(model, exclude=exclude)
+
+
+def parse_batch(texts: List[str]) -> bytes:
+    """Parse a batch of messages and return the docs serialized as DocBin bytes"""
+    doc_bin = DocBin()
+    for doc in _pipeline.pipe(texts):
+        doc_bin.add(doc)
+    return doc_bin.to_bytes()
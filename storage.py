@@ -0,0 +1,746 @@
+"""Bank data storage: the JSON journal and SQLite backends and their user search index.
+
+Kept apart from cra.py so that import_sqlite.py can use the stores without
+importing the Streamlit app, which opens the data store when it is imported.
+"""
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Transaction categorization rules, in priority order (first matching rule wins).
+# A 'category_rules' list in the bank data file overrides these defaults.
+DEFAULT_CATEGORY_RULES = [
+    {'category': 'Salary', 'keywords': ['salary']},
+    {'category': 'Transfer', 'keywords': ['transfer', 'send', 'received']},
+    {'category': 'Utilities', 'keywords': ['electric', 'water', 'gas', 'bill']},
+    {'category': 'Food & Dining', 'keywords': ['food', 'restaurant', 'coffee', 'dining']},
+    {'category': 'Entertainment', 'keywords': ['movie', 'concert', 'game', 'entertain']},
+    {'category': 'Healthcare', 'keywords': ['medical', 'hospital', 'pharmacy']},
+    {'category': 'Education', 'keywords': ['school', 'college', 'tuition', 'education']},
+    {'category': 'Travel', 'keywords': ['flight', 'hotel', 'travel', 'vacation']},
+    {'category': 'Shopping', 'keywords': ['amazon', 'flipkart', 'shopping', 'store']}
+]
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton reporting every keyword occurrence in one pass over the text"""
+    
+    def __init__(self, keywords: Dict[str, Any]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[tuple]] = [[]]
+        for keyword, payload in keywords.items():
+            self._add(keyword, payload)
+        self._build()
+    
+    def _add(self, keyword: str, payload: Any):
+        state = 0
+        for char in keyword:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self._output[state].append((keyword, payload))
+    
+    def _build(self):
+        """Compute failure links breadth-first and merge the outputs they reach"""
+        # States one character deep keep the root as their failure link
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+    
+    def find_all(self, text: str) -> List[tuple]:
+        """Get (end_index, keyword, payload) for every keyword occurrence in the text"""
+        hits = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for keyword, payload in self._output[state]:
+                hits.append((index, keyword, payload))
+        return hits
+
+class TransactionCategorizer:
+    """Single-pass transaction categorizer compiled from a rule table.
+    
+    All rule keywords go into one automaton, so a description is scanned once and
+    the highest-priority rule with a hit wins. Results are memoized per normalized
+    description since the same merchant strings repeat across transactions.
+    """
+    
+    def __init__(self, rules: List[Dict[str, Any]], default: str = 'Other'):
+        self.default = default
+        self._categories = [rule['category'] for rule in rules]
+        keywords = {}
+        for priority, rule in enumerate(rules):
+            for keyword in rule['keywords']:
+                keywords.setdefault(keyword.lower(), priority)
+        self._automaton = KeywordAutomaton(keywords)
+        self._categorize = lru_cache(maxsize=4096)(self._categorize_uncached)
+    
+    def _categorize_uncached(self, description: str) -> str:
+        hits = self._automaton.find_all(description)
+        if not hits:
+            return self.default
+        return self._categories[min(priority for _, _, priority in hits)]
+    
+    def categorize(self, description: str) -> str:
+        """Get the category for a transaction description"""
+        return self._categorize(description.strip().lower())
+    
+    def categorize_many(self, descriptions: List[str]) -> List[str]:
+        """Get categories for a batch of descriptions"""
+        return [self.categorize(description) for description in descriptions]
+
+def normalize_username(username: str) -> str:
+    """Normalize a username for case-insensitive lookups"""
+    return username.strip().casefold()
+
+class FuzzyIndex:
+    """Trigram inverted index for typo-tolerant lookups.
+    
+    Candidates are gathered from the posting lists of the query's trigrams, filtered
+    with the q-gram count bound (one edit changes at most three trigrams) and only
+    then verified with a bounded edit distance, so a lookup touches the terms that
+    share trigrams with the query instead of every indexed term.
+    """
+    
+    def __init__(self):
+        self._postings: Dict[str, set] = {}
+        self._terms: Dict[str, set] = {}
+        self._doc_terms: Dict[str, set] = {}
+    
+    @staticmethod
+    def _trigrams(term: str) -> List[str]:
+        padded = f"$${term}$$"
+        return [padded[i:i + 3] for i in range(len(padded) - 2)]
+    
+    def add(self, doc_id: str, term: str):
+        """Index a term (already normalized) for a document"""
+        if not term:
+            return
+        if term not in self._terms:
+            self._terms[term] = set()
+            for gram in set(self._trigrams(term)):
+                self._postings.setdefault(gram, set()).add(term)
+        self._terms[term].add(doc_id)
+        self._doc_terms.setdefault(doc_id, set()).add(term)
+    
+    def discard(self, doc_id: str):
+        """Remove every term indexed for a document"""
+        for term in self._doc_terms.pop(doc_id, set()):
+            docs = self._terms.get(term)
+            if docs is None:
+                continue
+            docs.discard(doc_id)
+            if not docs:
+                del self._terms[term]
+                for gram in set(self._trigrams(term)):
+                    self._postings[gram].discard(term)
+    
+    @staticmethod
+    def _edit_distance(a: str, b: str, max_distance: int) -> Optional[int]:
+        """Levenshtein distance, or None as soon as it must exceed max_distance"""
+        if abs(len(a) - len(b)) > max_distance:
+            return None
+        previous = list(range(len(b) + 1))
+        for i, char_a in enumerate(a, 1):
+            current = [i]
+            for j, char_b in enumerate(b, 1):
+                current.append(min(previous[j] + 1, current[j - 1] + 1,
+                                   previous[j - 1] + (char_a != char_b)))
+            if min(current) > max_distance:
+                return None
+            previous = current
+        return previous[-1] if previous[-1] <= max_distance else None
+    
+    def search(self, query: str, max_distance: int = 2, limit: int = 5,
+               substring: bool = False) -> List[Dict[str, Any]]:
+        """Get documents ranked by edit distance (substring hits rank as distance 0)"""
+        if not query:
+            return []
+        grams = self._trigrams(query)
+        shared: Dict[str, int] = {}
+        for gram in set(grams):
+            for term in self._postings.get(gram, ()):
+                shared[term] = shared.get(term, 0) + 1
+        
+        min_shared = max(1, len(set(grams)) - 3 * max_distance)
+        results = []
+        for term, count in shared.items():
+            if substring and query in term:
+                distance = 0
+            elif count < min_shared:
+                continue
+            else:
+                distance = self._edit_distance(query, term, max_distance)
+                if distance is None:
+                    continue
+            for doc_id in self._terms[term]:
+                results.append({'id': doc_id, 'term': term, 'distance': distance, 'shared': count})
+        
+        results.sort(key=lambda r: (r['distance'], -r['shared'], r['term']))
+        ranked, seen = [], set()
+        for result in results:
+            if result['id'] not in seen:
+                seen.add(result['id'])
+                ranked.append(result)
+        return ranked[:limit]
+
+class UserSearchIndex:
+    """Fuzzy indexes over usernames and customer contact fields, kept up to date by the data store.
+    
+    Every session thread searches while signups and profile edits update it, so
+    updates and searches hold one lock; a search never sees a half-updated user.
+    """
+    
+    SEARCH_FIELDS = ('name', 'email', 'contact', 'phone')
+    
+    def __init__(self):
+        self.usernames = FuzzyIndex()
+        self.customers = FuzzyIndex()
+        self._lock = threading.Lock()
+    
+    def add_user(self, user_key: str, user_data: Dict[str, Any]):
+        with self._lock:
+            self.usernames.discard(user_key)
+            self.customers.discard(user_key)
+            self.usernames.add(user_key, normalize_username(user_key))
+            for field in self.SEARCH_FIELDS:
+                value = user_data.get(field)
+                if value:
+                    self.customers.add(user_key, str(value).strip().casefold())
+    
+    def search_usernames(self, query: str, **options) -> List[Dict[str, Any]]:
+        with self._lock:
+            return self.usernames.search(query, **options)
+    
+    def search_customers(self, query: str, **options) -> List[Dict[str, Any]]:
+        with self._lock:
+            return self.customers.search(query, **options)
+
+class JournalStore:
+    """Append-only journal over a JSON snapshot of the bank data.
+    
+    Every mutation appends one small JSON record to the journal instead of rewriting
+    the whole snapshot. Loading replays the snapshot plus the journal, and a background
+    thread periodically folds the journal back into a fresh snapshot (compaction).
+    """
+    
+    SEQ_KEY = '_journal_seq'
+    
+    def __init__(self, snapshot_path: str, compact_every: int = 500, compact_interval: float = 60.0):
+        self.snapshot_path = Path(snapshot_path)
+        self.journal_path = self.snapshot_path.with_suffix('.journal')
+        self.rotated_path = self.snapshot_path.with_suffix('.journal.compacting')
+        self.compact_every = compact_every
+        self.compact_interval = compact_interval
+        self.data: Dict[str, Any] = {}
+        self._user_index: Dict[str, str] = {}
+        self.search_index = UserSearchIndex()
+        self._seq = 0
+        self._pending = 0
+        self._journal = None
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._compact_requested = threading.Event()
+        self._compactor: Optional[threading.Thread] = None
+    
+    # Sections kept outside the loaded dict (none: the JSON store holds everything in memory)
+    TABLE_SECTIONS = ()
+    
+    def _replay(self) -> Dict[str, Any]:
+        """Read the last snapshot and replay any journal records written after it"""
+        with open(self.snapshot_path, 'r') as f:
+            data = json.load(f)
+        data.setdefault('ledgers', {})
+        snapshot_seq = data.pop(self.SEQ_KEY, 0)
+        self._seq = snapshot_seq
+        
+        # A leftover rotated journal means a compaction was interrupted; replay it first
+        for path in (self.rotated_path, self.journal_path):
+            for record in self._read_journal(path):
+                if record['seq'] <= snapshot_seq:
+                    continue
+                self._apply(data, record)
+                self._seq = record['seq']
+                self._pending += 1
+        return data
+    
+    def read(self) -> Dict[str, Any]:
+        """Get the current data without opening the journal for writing"""
+        return self._replay()
+    
+    def load(self) -> Dict[str, Any]:
+        """Load the data and open the journal for appending"""
+        data = self._replay()
+        self.data = data
+        self._user_index = {normalize_username(uname): uname for uname in data.get('users', {})}
+        for uname, user_data in data.get('users', {}).items():
+            self.search_index.add_user(uname, user_data)
+        self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        if self.rotated_path.exists():
+            self.compact()
+        return data
+    
+    @staticmethod
+    def _read_journal(path: Path) -> List[Dict[str, Any]]:
+        """Read journal records, ignoring a torn final line left by a crash"""
+        records = []
+        if not path.exists():
+            return records
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+        return records
+    
+    @staticmethod
+    def _apply(data: Dict[str, Any], record: Dict[str, Any]):
+        """Apply a single journal record to the in-memory data"""
+        if record['op'] == 'batch':
+            # Sub-records share one journal line, so replay applies all of them or none
+            for sub_record in record['records']:
+                JournalStore._apply(data, sub_record)
+            return
+        
+        *parents, last = record['path']
+        target = data
+        for key in parents:
+            target = target[key]
+        
+        if record['op'] == 'set':
+            target[last] = record['value']
+        elif record['op'] == 'append':
+            target.setdefault(last, []).append(record['value'])
+        elif record['op'] == 'remove':
+            match = record['match']
+            target[last] = [item for item in target[last]
+                            if not all(item.get(k) == v for k, v in match.items())]
+        else:
+            raise ValueError(f"Unknown journal operation: {record['op']}")
+    
+    @staticmethod
+    def _make_record(op: str, path: List[str], value: Any = None,
+                     match: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        record = {'op': op, 'path': list(path)}
+        if op == 'remove':
+            record['match'] = match
+        else:
+            record['value'] = value
+        return record
+    
+    def record(self, op: str, path: List[str], value: Any = None, match: Optional[Dict[str, Any]] = None):
+        """Append a mutation to the journal and apply it in memory"""
+        self._commit(self._make_record(op, path, value, match))
+    
+    def record_batch(self, records: List[Dict[str, Any]]):
+        """Append several mutations as one journal record and apply them together"""
+        self._commit({'op': 'batch', 'records': records})
+    
+    def _commit(self, record: Dict[str, Any]):
+        # The record is durable before memory changes, so readers never see a mutation a crash would lose
+        with self._lock:
+            record['seq'] = self._seq + 1
+            self._journal.write(json.dumps(record, default=str) + '\n')
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._seq = record['seq']
+            self._apply(self.data, record)
+            self._pending += 1
+            if self._pending >= self.compact_every:
+                self._compact_requested.set()
+    
+    def compact(self):
+        """Write a fresh snapshot and drop the journal records it contains"""
+        with self._compact_lock:
+            with self._lock:
+                payload = json.dumps({**self.data, self.SEQ_KEY: self._seq}, indent=2, default=str)
+                self._journal.close()
+                if self.journal_path.exists():
+                    os.replace(self.journal_path, self.rotated_path)
+                self._journal = open(self.journal_path, 'a', encoding='utf-8')
+                self._pending = 0
+            
+            # Writers only wait for the serialization above, not for the disk write
+            tmp_path = self.snapshot_path.with_suffix('.json.tmp')
+            with open(tmp_path, 'w') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            if self.rotated_path.exists():
+                self.rotated_path.unlink()
+    
+    def find_user_key(self, username: str) -> Optional[str]:
+        """Get the stored key for a username (case-insensitive exact match)"""
+        return self._user_index.get(normalize_username(username))
+    
+    def list_usernames(self) -> List[str]:
+        return list(self.data['users'].keys())
+    
+    def get_user(self, user_key: str) -> Optional[Dict[str, Any]]:
+        return self.data['users'].get(user_key)
+    
+    def put_user(self, user_key: str, user_data: Dict[str, Any]):
+        self.record('set', ['users', user_key], user_data)
+        self._user_index[normalize_username(user_key)] = user_key
+        self.search_index.add_user(user_key, user_data)
+    
+    def update_user(self, user_key: str, field: str, value: Any):
+        self.record('set', ['users', user_key, field], value)
+        if field in UserSearchIndex.SEARCH_FIELDS:
+            self.search_index.add_user(user_key, self.data['users'][user_key])
+    
+    def post_transaction(self, user_key: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply a transaction to the user's balance and append it to their ledger atomically"""
+        with self._lock:
+            balance = self.data['users'][user_key]['balance'] + entry['amount']
+            entry = {**entry, 'balance': balance}
+            self.record_batch([self._make_record('set', ['users', user_key, 'balance'], balance),
+                               self._make_record('append', ['ledgers', user_key], entry)])
+        return entry
+    
+    def list_ledger(self, user_key: str, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        """Get a page of the user's ledger, most recent first"""
+        ledger = self.data['ledgers'].get(user_key, [])
+        end = len(ledger) - offset
+        page = ledger[max(0, end - limit):max(0, end)]
+        return [{**entry, 'date': datetime.fromisoformat(entry['date'])} for entry in reversed(page)]
+    
+    def list_bills(self) -> List[Dict[str, Any]]:
+        return self.data['bills']
+    
+    def add_bill(self, bill: Dict[str, Any]):
+        self.record('append', ['bills'], bill)
+    
+    def remove_bills(self, name: str):
+        self.record('remove', ['bills'], match={'name': name})
+    
+    def add_account_request(self, request: Dict[str, Any]):
+        self.record('append', ['account_requests'], request)
+    
+    def start_compactor(self):
+        """Start the background compaction thread (once per store)"""
+        if self._compactor is None:
+            self._compactor = threading.Thread(target=self._compact_loop,
+                                               name='journal-compactor', daemon=True)
+            self._compactor.start()
+    
+    def _compact_loop(self):
+        while True:
+            self._compact_requested.wait(self.compact_interval)
+            self._compact_requested.clear()
+            if self._pending:
+                try:
+                    self.compact()
+                except Exception as e:
+                    print(f"Error compacting journal: {e}")
+
+class DatabaseNotEmptyError(Exception):
+    """Raised when importing into a database that already holds data"""
+
+class SQLiteStore:
+    """Embedded SQLite backend with the same storage interface as JournalStore.
+    
+    Users, per-user transaction ledgers, bills and account requests live in indexed tables; catalog
+    sections (bank info, loans, schemes, account types, ...) and cards are loaded into
+    memory once. The database runs in WAL mode so session threads can read while a
+    single writer commits.
+    """
+    
+    TABLE_SECTIONS = ('users', 'transactions_history', 'ledgers', 'bills', 'account_requests')
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            username TEXT PRIMARY KEY,
+            username_norm TEXT NOT NULL UNIQUE,
+            name TEXT,
+            email TEXT,
+            phone TEXT,
+            account_number TEXT,
+            balance REAL NOT NULL DEFAULT 0,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
+        CREATE INDEX IF NOT EXISTS idx_users_phone ON users(phone);
+        CREATE INDEX IF NOT EXISTS idx_users_account_number ON users(account_number);
+        
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT,
+            created_at TEXT,
+            description TEXT NOT NULL,
+            amount REAL NOT NULL,
+            balance REAL,
+            category TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_transactions_user ON transactions(username, id);
+        
+        CREATE TABLE IF NOT EXISTS bills (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            amount REAL,
+            due TEXT,
+            status TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_bills_name ON bills(name);
+        CREATE INDEX IF NOT EXISTS idx_bills_due ON bills(due);
+        
+        CREATE TABLE IF NOT EXISTS account_requests (
+            request_id TEXT PRIMARY KEY,
+            username TEXT,
+            email TEXT,
+            status TEXT,
+            request_date TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_account_requests_status ON account_requests(status);
+        
+        CREATE TABLE IF NOT EXISTS cards (
+            card_id TEXT PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+        
+        CREATE TABLE IF NOT EXISTS catalog (
+            section TEXT PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+    """
+    
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self.data: Dict[str, Any] = {}
+        self.search_index = UserSearchIndex()
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection (sqlite3 connections are not shared across threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+    
+    @contextmanager
+    def _write(self):
+        """Serialize writers within the process and commit (or roll back) as one transaction"""
+        with self._write_lock:
+            conn = self._connect()
+            with conn:
+                yield conn
+    
+    def load(self) -> Dict[str, Any]:
+        """Create the schema if needed and load the catalog sections into memory"""
+        if not self.db_path.exists():
+            raise FileNotFoundError(2, "Database not found; import dummydata.json first", str(self.db_path))
+        
+        with self._write() as conn:
+            conn.executescript(self.SCHEMA)
+        
+        conn = self._connect()
+        data = {row['section']: json.loads(row['data'])
+                for row in conn.execute('SELECT section, data FROM catalog')}
+        data['cards'] = {row['card_id']: json.loads(row['data'])
+                         for row in conn.execute('SELECT card_id, data FROM cards')}
+        for row in conn.execute('SELECT username, data FROM users'):
+            self.search_index.add_user(row['username'], json.loads(row['data']))
+        self.data = data
+        return data
+    
+    DATA_TABLES = ('users', 'transactions', 'bills', 'account_requests', 'cards', 'catalog')
+    
+    def import_json(self, json_path: str = 'dummydata.json',
+                    replace: bool = False) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """Import a JSON data file (and its journal) into the database.
+        
+        A database that already holds data is refused, since the app may have written
+        to it since the last import. With replace, every row is deleted first, in the
+        same transaction as the inserts. Returns the imported counts and the number of
+        rows deleted per table.
+        """
+        source = JournalStore(json_path).read()
+        self.db_path.touch(exist_ok=True)
+        counts = {}
+        
+        with self._write() as conn:
+            conn.executescript(self.SCHEMA)
+            existing = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                        for table in self.DATA_TABLES}
+            if any(existing.values()) and not replace:
+                raise DatabaseNotEmptyError(f"{self.db_path} already holds data")
+            # The deletes open the transaction the inserts below commit with
+            cleared = {}
+            for table in self.DATA_TABLES:
+                cleared[table] = conn.execute(f'DELETE FROM {table}').rowcount if existing[table] else 0
+            
+            for username, user_data in source.get('users', {}).items():
+                self._upsert_user(conn, username, user_data)
+            counts['users'] = len(source.get('users', {}))
+            
+            # Legacy bank-wide history rows belong to no user
+            legacy = source.get('transactions_history', [])
+            rules = source.get('category_rules', DEFAULT_CATEGORY_RULES)
+            categories = TransactionCategorizer(rules).categorize_many([txn['name'] for txn in legacy])
+            for txn, category in zip(legacy, categories):
+                conn.execute('INSERT INTO transactions (description, amount, category) VALUES (?, ?, ?)',
+                             (txn['name'], txn['amt'], category))
+            for username, ledger in source.get('ledgers', {}).items():
+                for entry in ledger:
+                    self._insert_ledger_entry(conn, username, entry)
+            counts['transactions'] = (len(source.get('transactions_history', []))
+                                      + sum(len(ledger) for ledger in source.get('ledgers', {}).values()))
+            
+            for bill in source.get('bills', []):
+                self._insert_bill(conn, bill)
+            counts['bills'] = len(source.get('bills', []))
+            
+            for request in source.get('account_requests', []):
+                self._insert_account_request(conn, request)
+            counts['account_requests'] = len(source.get('account_requests', []))
+            
+            for card_id, card in source.get('cards', {}).items():
+                conn.execute('INSERT OR REPLACE INTO cards (card_id, data) VALUES (?, ?)',
+                             (card_id, json.dumps(card)))
+            counts['cards'] = len(source.get('cards', {}))
+            
+            catalog = {key: value for key, value in source.items()
+                       if key not in self.TABLE_SECTIONS and key != 'cards'}
+            for section, value in catalog.items():
+                conn.execute('INSERT OR REPLACE INTO catalog (section, data) VALUES (?, ?)',
+                             (section, json.dumps(value)))
+            counts['catalog'] = len(catalog)
+        
+        return counts, cleared
+    
+    @staticmethod
+    def _upsert_user(conn: sqlite3.Connection, username: str, user_data: Dict[str, Any]):
+        conn.execute(
+            'INSERT OR REPLACE INTO users '
+            '(username, username_norm, name, email, phone, account_number, balance, data) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (username, normalize_username(username), user_data.get('name'),
+             user_data.get('email', user_data.get('contact')), user_data.get('phone'),
+             user_data.get('account_number'), user_data.get('balance', 0.0),
+             json.dumps(user_data, default=str)))
+    
+    @staticmethod
+    def _insert_ledger_entry(conn: sqlite3.Connection, username: str, entry: Dict[str, Any]):
+        conn.execute('INSERT INTO transactions (username, created_at, description, amount, balance, category) '
+                     'VALUES (?, ?, ?, ?, ?, ?)',
+                     (username, entry['date'], entry['description'], entry['amount'],
+                      entry['balance'], entry.get('category')))
+    
+    @staticmethod
+    def _insert_bill(conn: sqlite3.Connection, bill: Dict[str, Any]):
+        conn.execute('INSERT INTO bills (name, amount, due, status, data) VALUES (?, ?, ?, ?, ?)',
+                     (bill['name'], bill.get('amount'), bill.get('due'), bill.get('status'),
+                      json.dumps(bill, default=str)))
+    
+    @staticmethod
+    def _insert_account_request(conn: sqlite3.Connection, request: Dict[str, Any]):
+        conn.execute(
+            'INSERT OR REPLACE INTO account_requests '
+            '(request_id, username, email, status, request_date, data) VALUES (?, ?, ?, ?, ?, ?)',
+            (request.get('request_id', str(uuid.uuid4())), request.get('username'), request.get('email'),
+             request.get('status'), request.get('request_date'), json.dumps(request, default=str)))
+    
+    def find_user_key(self, username: str) -> Optional[str]:
+        """Get the stored key for a username (case-insensitive exact match)"""
+        row = self._connect().execute('SELECT username FROM users WHERE username_norm = ?',
+                                      (normalize_username(username),)).fetchone()
+        return row['username'] if row else None
+    
+    def list_usernames(self) -> List[str]:
+        return [row['username'] for row in self._connect().execute('SELECT username FROM users')]
+    
+    def get_user(self, user_key: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute('SELECT balance, data FROM users WHERE username = ?',
+                                      (user_key,)).fetchone()
+        if not row:
+            return None
+        user = json.loads(row['data'])
+        user['balance'] = row['balance']
+        return user
+    
+    def put_user(self, user_key: str, user_data: Dict[str, Any]):
+        with self._write() as conn:
+            self._upsert_user(conn, user_key, user_data)
+        self.search_index.add_user(user_key, user_data)
+    
+    def update_user(self, user_key: str, field: str, value: Any):
+        with self._write() as conn:
+            row = conn.execute('SELECT balance, data FROM users WHERE username = ?', (user_key,)).fetchone()
+            if not row:
+                raise KeyError(user_key)
+            user = json.loads(row['data'])
+            user['balance'] = row['balance']
+            user[field] = value
+            self._upsert_user(conn, user_key, user)
+        if field in UserSearchIndex.SEARCH_FIELDS:
+            self.search_index.add_user(user_key, user)
+    
+    def post_transaction(self, user_key: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply a transaction to the user's balance and append it to their ledger atomically"""
+        with self._write() as conn:
+            conn.execute('UPDATE users SET balance = balance + ? WHERE username = ?',
+                         (entry['amount'], user_key))
+            row = conn.execute('SELECT balance FROM users WHERE username = ?', (user_key,)).fetchone()
+            if not row:
+                raise KeyError(user_key)
+            entry = {**entry, 'balance': row['balance']}
+            self._insert_ledger_entry(conn, user_key, entry)
+        return entry
+    
+    def list_ledger(self, user_key: str, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        """Get a page of the user's ledger, most recent first"""
+        rows = self._connect().execute(
+            'SELECT created_at, description, amount, balance, category FROM transactions '
+            'WHERE username = ? ORDER BY id DESC LIMIT ? OFFSET ?', (user_key, limit, offset))
+        return [{'date': datetime.fromisoformat(row['created_at']), 'description': row['description'],
+                 'amount': row['amount'], 'balance': row['balance'], 'category': row['category']}
+                for row in rows]
+    
+    def list_bills(self) -> List[Dict[str, Any]]:
+        return [json.loads(row['data'])
+                for row in self._connect().execute('SELECT data FROM bills ORDER BY due, id')]
+    
+    def add_bill(self, bill: Dict[str, Any]):
+        with self._write() as conn:
+            self._insert_bill(conn, bill)
+    
+    def remove_bills(self, name: str):
+        with self._write() as conn:
+            conn.execute('DELETE FROM bills WHERE name = ?', (name,))
+    
+    def add_account_request(self, request: Dict[str, Any]):
+        with self._write() as conn:
+            self._insert_account_request(conn, request)
+    
+    def compact(self):
+        """Fold the WAL back into the main database file"""
+        self._connect().execute('PRAGMA wal_checkpoint(TRUNCATE)')
@@ -0,0 +1,41 @@
+"""Regression cases for cra.DateRangeParser, with a fixed 'today'."""
+from datetime import date
+
+import pytest
+
+from cra import DateRangeParser
+
+TODAY = date(2026, 10, 17)
+
+
+def days(text):
+    found = DateRangeParser.parse(text, TODAY)
+    return found and (found.start and found.start.date(), found.end and found.end.date())
+
+
+@pytest.mark.parametrize("text, expected", [
+    # "to <payee>" is not a connector for a date further on
+    ("payments to mom last week", (date(2026, 10, 10), TODAY)),
+    ("how much did I pay to amazon yesterday", (date(2026, 10, 16), date(2026, 10, 16))),
+    ("transfers to savings in march", (date(2026, 3, 1), date(2026, 3, 31))),
+    ("payments to mom from last week", (date(2026, 10, 10), TODAY)),
+    # Connectors right before the date, optionally through "the"/"of"
+    ("transactions up to 5th march", (None, date(2026, 3, 5))),
+    ("until the 5th of march", (None, date(2026, 3, 5))),
+    ("before march", (None, date(2026, 2, 28))),
+    ("after 01/09/2026", (date(2026, 9, 2), TODAY)),
+    ("since last week", (date(2026, 10, 10), TODAY)),
+    # Ranges, in either order
+    ("from 01/05/2026 to 10/05/2026", (date(2026, 5, 1), date(2026, 5, 10))),
+    ("between 10/05/2026 and 01/05/2026", (date(2026, 5, 1), date(2026, 5, 10))),
+    # The start named by the second date
+    ("transactions till 10/10/2026 from 01/10/2026", (date(2026, 10, 1), date(2026, 10, 10))),
+    ("until 5th march since january", (date(2026, 1, 1), date(2026, 3, 5))),
+    ("from march to may 2026", (date(2026, 3, 1), date(2026, 5, 31))),
+    # Words that only contain 'to', and the verb 'may'
+    ("total spent today", (TODAY, TODAY)),
+    ("may I see my balance", None),
+    ("31/02/2026", None),
+])
+def test_parse(text, expected):
+    assert days(text) == expected
@@ -0,0 +1,137 @@
+"""Crash recovery of storage.JournalStore against a temporary snapshot."""
+import json
+import os
+
+import pytest
+
+from storage import JournalStore
+
+SNAPSHOT = {
+    'users': {'alice': {'name': 'Alice', 'balance': 100.0}},
+    'bills': [],
+    'account_requests': [],
+}
+ENTRY = {'date': '2026-10-17T09:00:00', 'description': 'Coffee', 'amount': -5.0, 'category': 'Food & Dining'}
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    path = tmp_path / 'bank.json'
+    path.write_text(json.dumps(SNAPSHOT))
+    return path
+
+
+def open_store(path):
+    store = JournalStore(str(path))
+    store.load()
+    return store
+
+
+def close(store):
+    store._journal.close()
+
+
+def journal_lines(store):
+    return store.journal_path.read_text(encoding='utf-8').splitlines()
+
+
+def test_replays_journal_over_snapshot(snapshot_path):
+    store = open_store(snapshot_path)
+    store.add_bill({'name': 'Water', 'amount': 30})
+    store.update_user('alice', 'name', 'Alice B')
+    close(store)
+
+    data = open_store(snapshot_path).data
+    assert data['bills'] == [{'name': 'Water', 'amount': 30}]
+    assert data['users']['alice']['name'] == 'Alice B'
+
+
+def test_ignores_torn_final_line(snapshot_path):
+    store = open_store(snapshot_path)
+    store.add_bill({'name': 'Water', 'amount': 30})
+    close(store)
+    with open(store.journal_path, 'a', encoding='utf-8') as f:
+        f.write('{"op": "append", "path": ["bills"], "val')
+
+    reopened = open_store(snapshot_path)
+    assert reopened.data['bills'] == [{'name': 'Water', 'amount': 30}]
+    assert reopened._seq == 1
+
+
+def test_replays_rotated_journal_from_interrupted_compaction(snapshot_path):
+    store = open_store(snapshot_path)
+    store.add_bill({'name': 'Water', 'amount': 30})
+    close(store)
+    # Compaction rotated the journal, then crashed before writing the snapshot
+    os.replace(store.journal_path, store.rotated_path)
+    with open(store.journal_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'op': 'append', 'path': ['bills'], 'value': {'name': 'Gas'}, 'seq': 2}) + '\n')
+
+    reopened = open_store(snapshot_path)
+    assert [bill['name'] for bill in reopened.data['bills']] == ['Water', 'Gas']
+    # Loading finishes the compaction
+    assert not reopened.rotated_path.exists()
+    assert json.loads(snapshot_path.read_text())['_journal_seq'] == 2
+
+
+def test_skips_records_already_in_the_snapshot(snapshot_path):
+    store = open_store(snapshot_path)
+    store.add_bill({'name': 'Water', 'amount': 30})
+    store.add_bill({'name': 'Gas', 'amount': 20})
+    old_journal = store.journal_path.read_text(encoding='utf-8')
+    store.compact()
+    close(store)
+    # Crash after the snapshot was replaced but before the rotated journal was removed
+    store.rotated_path.write_text(old_journal, encoding='utf-8')
+
+    reopened = open_store(snapshot_path)
+    assert [bill['name'] for bill in reopened.data['bills']] == ['Water', 'Gas']
+    assert reopened._seq == 2
+    reopened.add_bill({'name': 'Power', 'amount': 10})
+    assert json.loads(journal_lines(reopened)[-1])['seq'] == 3
+
+
+def test_posting_is_one_batch_record(snapshot_path):
+    store = open_store(snapshot_path)
+    entry = store.post_transaction('alice', ENTRY)
+    close(store)
+    assert entry['balance'] == 95.0
+    records = [json.loads(line) for line in journal_lines(store)]
+    assert [record['op'] for record in records] == ['batch']
+    assert [sub['op'] for sub in records[0]['records']] == ['set', 'append']
+
+    data = open_store(snapshot_path).data
+    assert data['users']['alice']['balance'] == 95.0
+    assert data['ledgers']['alice'] == [entry]
+
+
+def test_torn_batch_applies_neither_half(snapshot_path):
+    store = open_store(snapshot_path)
+    store.post_transaction('alice', ENTRY)
+    close(store)
+    line = journal_lines(store)[0]
+    # Cut the line after the balance update, before the ledger entry
+    store.journal_path.write_text(line[:line.index('"append"')], encoding='utf-8')
+
+    data = open_store(snapshot_path).data
+    assert data['users']['alice']['balance'] == 100.0
+    assert data['ledgers'].get('alice', []) == []
+
+
+class FailingJournal:
+    def write(self, text):
+        raise OSError("disk full")
+
+
+def test_failed_write_leaves_memory_unchanged(snapshot_path):
+    store = open_store(snapshot_path)
+    close(store)
+    store._journal = FailingJournal()
+    with pytest.raises(OSError):
+        store.post_transaction('alice', ENTRY)
+    with pytest.raises(OSError):
+        store.add_bill({'name': 'Water', 'amount': 30})
+    assert store.data['users']['alice']['balance'] == 100.0
+    assert store.data['ledgers'] == {}
+    assert store.data['bills'] == []
+    assert store._seq == 0
@@ -0,0 +1,129 @@
+"""cra.OllamaClient against fake_ollama.FakeOllamaServer: deadlines, call slots and the circuit breaker."""
+import time
+
+import ollama
+import pytest
+
+from cra import CircuitBreaker, LLMUnavailableError, OllamaClient, RexaBot, ServerBusyError
+from fake_ollama import FakeOllamaServer
+
+OPTIONS = {'num_predict': 8}
+
+
+@pytest.fixture
+def server():
+    with FakeOllamaServer(first_token_ms=0, token_ms=0, tokens=5) as server:
+        yield server
+
+
+def make_client(server, max_concurrent=2, read_timeout=5.0, failure_threshold=2, cooldown=0.2):
+    return OllamaClient(server.url, max_concurrent=max_concurrent, connect_timeout=1.0, read_timeout=read_timeout,
+                        breaker=CircuitBreaker(failure_threshold, cooldown))
+
+
+def wait_for(condition, timeout=5.0):
+    end = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < end, "condition not reached in time"
+        time.sleep(0.01)
+
+
+def test_streams_all_tokens(server):
+    client = make_client(server)
+    stream = client.generate_stream("hello", OPTIONS, timeout=5.0)
+    assert "".join(stream) == "".join(f"word{i} " for i in range(5))
+    assert not stream.timed_out
+    assert client.breaker.state == 'closed'
+
+
+def test_deadline_expires_while_server_hangs(server):
+    server.mode = 'hang'
+    client = make_client(server, max_concurrent=1, read_timeout=0.5)
+    started = time.monotonic()
+    stream = client.generate_stream("hello", OPTIONS, timeout=0.2)
+    assert list(stream) == []
+    assert stream.timed_out
+    assert time.monotonic() - started < 0.45
+    # The failure counts at the deadline, but the slot stays taken until the blocked reader gives up
+    assert client.breaker._failures == 1
+    with pytest.raises(ServerBusyError):
+        client.generate_stream("hello", OPTIONS, timeout=0.2, queue_timeout=0)
+    assert client._slots.acquire(timeout=2.0)
+    client._slots.release()
+
+
+def test_server_busy_when_slots_are_taken(server):
+    server.first_token_ms = 500
+    client = make_client(server, max_concurrent=1)
+    stream = client.generate_stream("hello", OPTIONS, timeout=5.0)
+    with pytest.raises(ServerBusyError):
+        client.generate_stream("hello", OPTIONS, timeout=5.0, queue_timeout=0.05)
+    assert list(stream)
+    wait_for(lambda: client._slots.acquire(blocking=False))
+    client._slots.release()
+
+
+def fail_once(client):
+    with pytest.raises(ollama.ResponseError):
+        list(client.generate_stream("hello", OPTIONS, timeout=5.0))
+
+
+def test_breaker_opens_then_closes_after_a_good_trial_call(server):
+    server.mode = 'error'
+    client = make_client(server)
+    fail_once(client)
+    assert client.breaker.state == 'closed'
+    fail_once(client)
+    assert client.breaker.state == 'open'
+
+    requests = server.requests
+    with pytest.raises(LLMUnavailableError):
+        client.generate_stream("hello", OPTIONS, timeout=5.0)
+    assert server.requests == requests
+
+    time.sleep(0.25)
+    server.mode = 'ok'
+    server.first_token_ms = 100
+    stream = client.generate_stream("hello", OPTIONS, timeout=5.0)
+    assert client.breaker.state == 'half_open'
+    # Only the one trial call is let through while half open
+    with pytest.raises(LLMUnavailableError):
+        client.generate_stream("hello", OPTIONS, timeout=5.0)
+    assert list(stream)
+    assert client.breaker.state == 'closed'
+
+
+def test_breaker_reopens_after_a_failed_trial_call(server):
+    server.mode = 'error'
+    client = make_client(server)
+    fail_once(client)
+    fail_once(client)
+    time.sleep(0.25)
+    fail_once(client)
+    assert client.breaker.state == 'open'
+    with pytest.raises(LLMUnavailableError):
+        client.generate_stream("hello", OPTIONS, timeout=5.0)
+
+
+@pytest.fixture(scope='module')
+def bot():
+    return RexaBot()
+
+
+def test_fallback_answer_while_breaker_is_open(server, bot, monkeypatch):
+    client = make_client(server, failure_threshold=1, cooldown=60)
+    client.breaker.record_failure()
+    monkeypatch.setattr(bot, 'llm_client', client)
+    monkeypatch.setattr(bot, '_get_random_response', lambda response_type: f"<{response_type}>")
+    assert bot._get_ollama_response("what is a sovereign gold bond") == "<fallback>"
+    assert server.requests == 0
+
+
+def test_fallback_answer_when_server_is_busy(server, bot, monkeypatch):
+    server.first_token_ms = 3000
+    client = make_client(server, max_concurrent=1)
+    stream = client.generate_stream("hello", OPTIONS, timeout=5.0)
+    monkeypatch.setattr(bot, 'llm_client', client)
+    monkeypatch.setattr(bot, '_get_random_response', lambda response_type: f"<{response_type}>")
+    assert bot._get_ollama_response("what is a sovereign gold bond") == "<fallback>"
+    stream.cancel()
@@ -0,0 +1,120 @@
+"""Stored password formats, lazy upgrade on login and malformed hashes in cra.CGBankDatabase."""
+import hashlib
+import json
+
+import pytest
+
+import cra
+from cra import CGBankDatabase, LEGACY_PASSWORD_ITERATIONS, LEGACY_PASSWORD_SALT
+from storage import JournalStore
+
+PASSWORD = "S3cret!pass"
+ITERATIONS = 1000
+
+
+def legacy_pbkdf2(password):
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), LEGACY_PASSWORD_SALT.encode('utf-8'),
+                               LEGACY_PASSWORD_ITERATIONS).hex()
+
+
+def sha256(password):
+    return hashlib.sha256(password.encode('utf-8')).hexdigest()
+
+
+FORMATS = {
+    'current': lambda password: CGBankDatabase.hash_password(password),
+    'legacy_pbkdf2': legacy_pbkdf2,
+    'sha256': sha256,
+    'plaintext': lambda password: password,
+}
+
+
+@pytest.fixture(autouse=True)
+def cheap_hashes(monkeypatch):
+    monkeypatch.setattr(cra, 'PASSWORD_ITERATIONS', ITERATIONS)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """A JournalStore on a temp snapshot in place of the app's, recording update_user calls"""
+    path = tmp_path / 'bank.json'
+    path.write_text(json.dumps({'users': {}, 'bills': [], 'account_requests': []}))
+    store = JournalStore(str(path))
+    store.load()
+    store.updates = []
+    update_user = store.update_user
+
+    def record_update(user_key, field, value):
+        store.updates.append((user_key, field, value))
+        update_user(user_key, field, value)
+    monkeypatch.setattr(store, 'update_user', record_update)
+    monkeypatch.setattr(cra, 'DATA_STORE', store)
+    return store
+
+
+def add_user(store, username, stored_password):
+    store.put_user(username, {'name': username, 'password': stored_password, 'balance': 0.0})
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_check_password_accepts_each_format(fmt):
+    stored = FORMATS[fmt](PASSWORD)
+    assert CGBankDatabase.check_password(PASSWORD, stored)
+    assert not CGBankDatabase.check_password(PASSWORD + "x", stored)
+
+
+@pytest.mark.parametrize("fmt, needs_upgrade", [
+    ('current', False), ('legacy_pbkdf2', True), ('sha256', True), ('plaintext', True)])
+def test_password_needs_upgrade(fmt, needs_upgrade):
+    assert CGBankDatabase.password_needs_upgrade(FORMATS[fmt](PASSWORD)) is needs_upgrade
+
+
+def test_cheaper_current_hash_needs_upgrade():
+    assert CGBankDatabase.password_needs_upgrade(CGBankDatabase.hash_password(PASSWORD, ITERATIONS // 2))
+
+
+@pytest.mark.parametrize("stored", [
+    "pbkdf2_sha256$",
+    "pbkdf2_sha256$notanumber$salt$digest",
+    "pbkdf2_sha256$1000$salt",
+    "pbkdf2_sha256$0$salt$digest",
+])
+def test_malformed_current_hash_is_rejected(stored):
+    assert not CGBankDatabase.check_password(PASSWORD, stored)
+    assert not CGBankDatabase.check_password(stored, stored)
+    assert CGBankDatabase.password_needs_upgrade(stored)
+
+
+@pytest.mark.parametrize("fmt", ['legacy_pbkdf2', 'sha256', 'plaintext'])
+def test_login_upgrades_old_formats(store, fmt):
+    username = f"user_{fmt}"
+    add_user(store, username, FORMATS[fmt](PASSWORD))
+
+    assert CGBankDatabase.verify_user(username, PASSWORD)
+
+    [(user_key, field, upgraded)] = store.updates
+    assert (user_key, field) == (username, 'password')
+    assert upgraded.startswith(f"pbkdf2_sha256${ITERATIONS}$")
+    assert CGBankDatabase.check_password(PASSWORD, upgraded)
+    # The upgrade is journaled, so it survives a restart
+    reloaded = JournalStore(str(store.snapshot_path)).read()
+    assert reloaded['users'][username]['password'] == upgraded
+
+
+def test_login_with_current_hash_does_not_rewrite_it(store):
+    add_user(store, "user_current", FORMATS['current'](PASSWORD))
+    assert CGBankDatabase.verify_user("user_current", PASSWORD)
+    assert store.updates == []
+
+
+def test_failed_login_does_not_upgrade(store):
+    add_user(store, "user_wrong", sha256(PASSWORD))
+    assert not CGBankDatabase.verify_user("user_wrong", PASSWORD + "x")
+    assert store.updates == []
+    assert store.get_user("user_wrong")['password'] == sha256(PASSWORD)
+
+
+def test_login_with_malformed_hash_fails(store):
+    add_user(store, "user_malformed", "pbkdf2_sha256$notanumber$salt$digest")
+    assert not CGBankDatabase.verify_user("user_malformed", PASSWORD)
+    assert store.updates == []